@@ -1,5 +1,5 @@
 from random import uniform
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional
 
 from PyQt6.QtWidgets import QGraphicsScene, QGraphicsSceneMouseEvent, QGraphicsSceneDragDropEvent, QGraphicsTextItem
 from PyQt6.QtCore import Qt, QPointF, QRectF, pyqtSlot
@@ -21,6 +21,10 @@ class CanvasScene(QGraphicsScene):
     scene_width = 64000
     scene_height = 64000
 
+    # Images have to stay below the notes and groups (z value 9999 and above),
+    # so their z values are compacted again when the next one would reach this value (see getNextImageZValue)
+    max_image_z_value = 9000
+
     def __init__(self):
         super().__init__()
 
@@ -29,6 +33,30 @@ class CanvasScene(QGraphicsScene):
         self.search_bar = None
         self.history = None
 
+        # Number of top level items in the scene (including the disclaimer text)
+        # This is tracked in addItem/removeItem, so it is not necessary to create a list of all items just to count them
+        self.item_count = 0
+
+        # The images, groups and notes on the canvas are additionally kept in separate lists
+        # This way they can be accessed without going through every item in the scene (including handles, texts, ...)
+        self.image_items: List[ImageGraphicsItem] = []
+        self.group_items: List[Group] = []
+        self.note_items: List[Note] = []
+
+        # The highest z value given to an image. An image is moved on top of the others by giving it the next higher
+        # z value, so the z values of all other images don't have to be changed
+        self.image_z_value = 0
+
+        # Cached bounding rect of all items, which is used to zoom out to the whole canvas
+        # It is reset whenever items are added, removed, moved or scaled (see invalidateItemsBoundingRect)
+        self.items_bounding_rect: Optional[QRectF] = None
+
+        # While many items are changed at once (e.g. when scaling a group), each of them requests an update of the scene.
+        # These requests are collected and result in a single update when the changes are done (see deferUpdates)
+        self.update_defer_depth = 0
+        self.update_pending = False
+        self.pending_update_rect: Optional[QRectF] = None  # The combined area of the collected updates, None for the whole scene
+
         # The box is the area where the images that are removed from the canvas will go and act as negative examples
         self.box = Box()
         self.box.image_double_clicked.connect(self.addImage)
@@ -42,6 +70,10 @@ class CanvasScene(QGraphicsScene):
         # when the user clicks on an image
         self.preview_window = PreviewWindow(None)
 
+        # Use the BSP tree to index the items (Qt's default), so spatial queries like the content of a group
+        # only have to check the items in the queried area
+        self.setItemIndexMethod(QGraphicsScene.ItemIndexMethod.BspTreeIndex)
+
         # Set the scene size
         self.setSceneRect(-self.scene_width // 2, -self.scene_height // 2, self.scene_width, self.scene_height)
 
@@ -56,6 +88,14 @@ class CanvasScene(QGraphicsScene):
 
         super().mousePressEvent(event)
 
+    def mouseReleaseEvent(self, event: QGraphicsSceneMouseEvent) -> None:
+        """
+        Override the mouseReleaseEvent to reset the cached bounding rect, since items may have been moved or scaled.
+        """
+        super().mouseReleaseEvent(event)
+
+        self.invalidateItemsBoundingRect()
+
     def keyPressEvent(self, event: QKeyEvent) -> None:
         """
         Override the keyPressEvent to delete the selected items when the user presses the delete or backspace key.
@@ -133,7 +173,7 @@ class CanvasScene(QGraphicsScene):
 
         # Test if the scene is empty and draw the disclaimer text if it is
         # Since the text itself
-        if len(self.items()) <= 1:
+        if self.isPlaceholderOnly():
             pos = rect.center()
             pos -= QPointF(self.disclaimer_text.boundingRect().width() / 2,
                            self.disclaimer_text.boundingRect().height() / 2)
@@ -150,10 +190,11 @@ class CanvasScene(QGraphicsScene):
         """
         Slot that is called when an item on the canvas is moved.
         """
-        self.updateGroups()
+        group_contents = self.updateGroups()
 
         if isinstance(item, Group):
-            for image in item.getImages():
+            # Reuse the content that was determined while updating the groups instead of querying the scene again
+            for image in item.getImages(group_contents.get(item)):
                 image.checkForGroupNameOverlap()
 
         self.history.addTimeStamp()
@@ -163,16 +204,124 @@ class CanvasScene(QGraphicsScene):
         """
         Slot that is called when an item on the canvas is scaled.
         """
-        self.updateGroups()
+        group_contents = self.updateGroups()
 
         if isinstance(item, Group):
-            for image in item.getImages():
+            # Reuse the content that was determined while updating the groups instead of querying the scene again
+            for image in item.getImages(group_contents.get(item)):
                 image.checkForGroupNameOverlap()
 
         self.history.addTimeStamp()
 
+    def addItem(self, item: QGraphicsItem) -> None:
+        if item.scene() is not self:
+            self.item_count += 1
+            self.getItemList(item).append(item)
+
+        super().addItem(item)
+        self.invalidateItemsBoundingRect()
+
+    def removeItem(self, item: QGraphicsItem) -> None:
+        if item.scene() is self:
+            self.item_count -= 1
+
+            item_list = self.getItemList(item)
+            if item in item_list:
+                item_list.remove(item)
+
+        super().removeItem(item)
+        self.invalidateItemsBoundingRect()
+
+    def getItemList(self, item: QGraphicsItem) -> list:
+        """
+        Returns the list in which the given item is tracked based on its type.
+        Items that are not tracked (e.g. the disclaimer text) get a new, unused list.
+        """
+        if isinstance(item, ImageGraphicsItem):
+            return self.image_items
+        if isinstance(item, Group):
+            return self.group_items
+        if isinstance(item, Note):
+            return self.note_items
+
+        return []
+
+    def update(self, *args) -> None:
+        """
+        Override update to reset the cached bounding rect.
+        The scene is updated after every programmatic change of the items (adding groups, resizing, ...).
+        """
+        self.invalidateItemsBoundingRect()
+
+        if self.update_defer_depth > 0:
+            rect = QRectF(*args) if args else QRectF()
+
+            # An update of the whole scene includes all other updates, otherwise the updated areas are combined
+            if rect.isNull() or (self.update_pending and self.pending_update_rect is None):
+                self.pending_update_rect = None
+            elif self.update_pending:
+                self.pending_update_rect = self.pending_update_rect.united(rect)
+            else:
+                self.pending_update_rect = rect
+
+            self.update_pending = True
+            return
+
+        super().update(*args)
+
+    def deferUpdates(self) -> None:
+        """
+        Collects all update requests until resumeUpdates is called. Calls can be nested.
+        """
+        self.update_defer_depth += 1
+
+    def resumeUpdates(self) -> None:
+        """
+        Ends a deferUpdates call and updates the scene once if any update was requested in the meantime.
+        """
+        self.update_defer_depth -= 1
+
+        if self.update_defer_depth == 0 and self.update_pending:
+            self.update_pending = False
+
+            if self.pending_update_rect is None:
+                self.update()
+            else:
+                self.update(self.pending_update_rect)
+
+    def itemsBoundingRect(self) -> QRectF:
+        """
+        Returns the bounding rect of all items in the scene.
+        The result is cached until the items change, so it only has to be calculated once for a static canvas.
+        """
+        if self.items_bounding_rect is None:
+            self.items_bounding_rect = super().itemsBoundingRect()
+
+        return self.items_bounding_rect
+
+    def invalidateItemsBoundingRect(self) -> None:
+        self.items_bounding_rect = None
+
+    def itemCount(self) -> int:
+        """
+        Returns the number of top level items in the scene without iterating over them.
+        """
+        return self.item_count
+
+    def isPlaceholderOnly(self) -> bool:
+        """
+        Returns whether the disclaimer text is the only item in the scene (i.e. the canvas is empty).
+        """
+        return self.item_count <= 1
+
     def clear(self) -> None:
         super().clear()
+        self.item_count = 0
+        self.image_items = []
+        self.group_items = []
+        self.note_items = []
+        self.image_z_value = 0
+        self.invalidateItemsBoundingRect()
 
         # Add new disclaimer text because the reference to the old one is lost when the scene is cleared
         self.addItem(self.createDisclaimer())
@@ -242,6 +391,8 @@ class CanvasScene(QGraphicsScene):
 
                     colliding_items = [item for item in self.collidingItems(image) if isinstance(item, ImageGraphicsItem) or isinstance(item, Group)]
 
+        # New images (created from an id or dropped onto the canvas) are placed on top of the other images
+        image.setZValue(self.getNextImageZValue())
         self.addItem(image)
 
         # Since the image is added to the canvas it can no longer be in the box or search bar and its weight is positive
@@ -255,19 +406,25 @@ class CanvasScene(QGraphicsScene):
         self.search_bar.updateResults()
         self.history.addTimeStamp()
 
-    def addCustomImage(self, path: str) -> None:
+    def addCustomImage(self, path: str, add_time_stamp: bool = True) -> None:
         """
         Adds a custom image to the canvas.
         Note that since the image is not in the embedding it can not influence the search.
 
         :param path: The path to the image file that should be added
+        :param add_time_stamp: Whether a timestamp is added to the history. This can be disabled if the caller adds
+                               a timestamp itself
         """
         image = self.createImage(-1, path)
+        image.setZValue(self.getNextImageZValue())
         self.placeInViewCenter(image)
 
         self.addItem(image)
         self.update()
 
+        if add_time_stamp:
+            self.history.addTimeStamp()
+
     def removeImage(self, image: ImageGraphicsItem) -> None:
         """
         Removes an image from the canvas.
@@ -420,17 +577,23 @@ class CanvasScene(QGraphicsScene):
         # Since this is the only place where the box button is used we access it using this "hacky" way
         self.views()[0].parent().parent().box_button.shake_animation.start()
 
-    def updateGroups(self) -> None:
+    def updateGroups(self) -> Dict[Group, List[QGraphicsItem]]:
         """
         Updates the groups in the search.
         This should be called whenever the content of a group changes or a group is added/removed
         to make sure the search is up-to-date.
+
+        :return: The content of each group, so callers do not have to query the scene for it again
         """
         images = self.getImages()
+        group_contents = {}
 
         for group in self.getGroups():
+            content = group.getContent()
+            group_contents[group] = content
+
             # Set the images in the group as positive and all other images as negative
-            positive = [image.id for image in group.getContent() if isinstance(image, ImageGraphicsItem)]
+            positive = [image.id for image in content if isinstance(image, ImageGraphicsItem)]
             negative = [image.id for image in images if image.id not in positive]
 
             self.artsearch.updateGroup(group, positive, negative)
@@ -438,6 +601,8 @@ class CanvasScene(QGraphicsScene):
         # self.artsearch.update()
         self.artsearch.content_change()
 
+        return group_contents
+
     def toggleNotes(self) -> None:
         """
         Toggles the opacity of all notes.
@@ -462,13 +627,13 @@ class CanvasScene(QGraphicsScene):
         self.update()
 
     def getImages(self) -> List[ImageGraphicsItem]:
-        return [item for item in self.items() if isinstance(item, ImageGraphicsItem)]
+        return list(self.image_items)
 
     def getGroups(self) -> List[Group]:
-        return [item for item in self.items() if isinstance(item, Group)]
+        return list(self.group_items)
 
     def getNotes(self) -> List[Note]:
-        return [item for item in self.items() if isinstance(item, Note)]
+        return list(self.note_items)
 
     def getMaxImageZValue(self) -> float:
         """
@@ -482,6 +647,22 @@ class CanvasScene(QGraphicsScene):
         """
         return min([image.zValue() for image in self.getImages()])
 
+    def getNextImageZValue(self) -> float:
+        """
+        Returns a z value that places an image on top of all other images.
+        When the z values get too high they are compacted to 0..n-1, keeping the order of the images.
+        """
+        self.image_z_value += 1
+
+        if self.image_z_value >= self.max_image_z_value:
+            images = sorted(self.getImages(), key=lambda image: image.zValue())
+            for z_value, image in enumerate(images):
+                image.setZValue(z_value)
+
+            self.image_z_value = len(images)
+
+        return self.image_z_value
+
     def createDisclaimer(self) -> QGraphicsTextItem:
         """
         Creates the disclaimer text that is displayed when the canvas is empty.
@@ -565,6 +746,8 @@ class CanvasScene(QGraphicsScene):
             self.search_bar.removeImage(image.id)
             self.artsearch.setImagePositive(image.id)
 
+            self.image_z_value = max(self.image_z_value, image.zValue())
+
         for group_data in data['groups']:
             group = self.createGroup()
             group.setPos(group_data['x'], group_data['y'])
@@ -1,15 +1,19 @@
 import sys
 import os
-from typing import Tuple
+from typing import Tuple, Dict
 
 from PyQt6.QtWidgets import QGraphicsView, QSlider, QPushButton, QVBoxLayout, QHBoxLayout, QSizePolicy
-from PyQt6.QtCore import Qt, QEvent, pyqtSlot
-from PyQt6.QtGui import QTransform, QWheelEvent, QNativeGestureEvent, QMouseEvent, QIcon, QKeyEvent
+from PyQt6.QtCore import Qt, QEvent, QTimer, pyqtSlot
+from PyQt6.QtGui import QTransform, QMouseEvent, QIcon, QKeyEvent
 
 from gui.CanvasScene import CanvasScene
 
 base_path = os.path.dirname(__file__)
 
+# The platform does not change at runtime, so it is only checked once
+IS_WINDOWS = sys.platform == 'win32'
+IS_MACOS = sys.platform == 'darwin'
+
 
 class CanvasView(QGraphicsView):
     """
@@ -29,6 +33,11 @@ class CanvasView(QGraphicsView):
         self.zoom_clamp: bool = True               # Whether to clamp the zoom to the zoom range or not
         self.freeze: bool = False                  # Whether to freeze the zoom (disable zooming) or not
 
+        # Precompute the scale factors for every possible step difference within the zoom range
+        max_steps = self.zoom_range[1] - self.zoom_range[0]
+        self.zoom_factors: Dict[int, float] = {steps: self.zoom_factor ** steps
+                                               for steps in range(-max_steps, max_steps + 1)}
+
         # Since we zoom out to the full scene when the user double clicks we have to store the transformations used
         # to zoom out, to be able to zoom back in to the same position
         self.current_transform = None
@@ -37,10 +46,32 @@ class CanvasView(QGraphicsView):
         # These variables are only used on macOS
         # since the event is emitted way too often to reduce/increase by one level each time.
         # Instead, we accumulate the "pinch amount" in the counter and zoom when it reaches a certain threshold.
-        if sys.platform == 'darwin':
+        if IS_MACOS:
             self.zoom_value_counter: float = 0
             self.zoom_value_threshold: float = 0.1
 
+        # These variables are only used on Windows
+        # High resolution wheels and touchpads emit several wheel events per notch, so the angle deltas are accumulated
+        # and the view only zooms one step per full notch (120).
+        # Leftover deltas are discarded when the user stops scrolling for a short moment.
+        if IS_WINDOWS:
+            self.wheel_delta_counter: int = 0
+            self.wheel_delta_threshold: int = 120
+
+            self.wheel_reset_timer = QTimer(self)
+            self.wheel_reset_timer.setSingleShot(True)
+            self.wheel_reset_timer.setInterval(50)
+            self.wheel_reset_timer.timeout.connect(self.resetWheelDeltaCounter)
+
+        # Holding the plus/minus key emits auto repeat events faster than the display refreshes.
+        # These are collected and applied at most once per frame (16ms at 60Hz).
+        self.pending_zoom_steps: int = 0
+
+        self.key_zoom_timer = QTimer(self)
+        self.key_zoom_timer.setSingleShot(True)
+        self.key_zoom_timer.setInterval(16)
+        self.key_zoom_timer.timeout.connect(self.applyPendingZoomSteps)
+
         self.zoom = 5
 
         # Call functions to set up the UI and the (scrollbar) policies
@@ -51,6 +82,9 @@ class CanvasView(QGraphicsView):
         # Set the drag mode to be able to drag the scene around to navigate it
         self.setDragMode(QGraphicsView.DragMode.ScrollHandDrag)
 
+        # Zoom towards the view center by default (slider and keyboard), see zoomUnderMouse for the wheel and pinching
+        self.setTransformationAnchor(QGraphicsView.ViewportAnchor.AnchorViewCenter)
+
         # Create the actual scene (canvas) and display it in the view
         self.setScene(CanvasScene())
 
@@ -64,7 +98,7 @@ class CanvasView(QGraphicsView):
 
     def mouseDoubleClickEvent(self, event: QMouseEvent) -> None:
 
-        if len(self.scene().items()) <= 1:
+        if self.scene().isPlaceholderOnly():
             # If there is only on item in the scene it is the placeholder text.
             # In this case we don't want to zoom out but just ignore the event
             return super().mouseDoubleClickEvent(event)
@@ -73,6 +107,10 @@ class CanvasView(QGraphicsView):
         clicked_item = self.scene().itemAt(self.mapToScene(event.pos()), QTransform())
 
         if event.button() == Qt.MouseButton.LeftButton and clicked_item is None:
+            # Changing the transform, center and drag mode each request a repaint of the viewport
+            # Disable the updates while changing them, so the viewport is only repainted once at the end
+            self.viewport().setUpdatesEnabled(False)
+
             # Check if the canvas is already zoomed out to fit the scene or not and zoom accordingly
             if self.freeze:
                 # Reset the view center point and restore the transform from before zooming out
@@ -94,6 +132,9 @@ class CanvasView(QGraphicsView):
                 self.fitInView(self.scene().itemsBoundingRect(), Qt.AspectRatioMode.KeepAspectRatio)
                 self.freeze = True
 
+            self.viewport().setUpdatesEnabled(True)
+            self.viewport().update()
+
         super().mouseDoubleClickEvent(event)
 
     def mousePressEvent(self, event: QMouseEvent) -> None:
@@ -113,17 +154,29 @@ class CanvasView(QGraphicsView):
         Handle zooming for both Windows and macOS.
         For Windows, a QWheelEvent is emitted, for macOS a QNativeGestureEvent.
         """
-        if isinstance(event, QWheelEvent) and sys.platform == 'win32' \
-                and abs(event.angleDelta().y()) >= 50:
-            # Handle zooming on Windows if the mouse wheel was scrolled "enough"
-            self.setTransformationAnchor(QGraphicsView.ViewportAnchor.AnchorUnderMouse)
-            self.zoom += 1 if event.angleDelta().y() > 0 else -1
-            self.setTransformationAnchor(QGraphicsView.ViewportAnchor.AnchorViewCenter)
+        # This is called for every event of the viewport (including every mouse move while panning),
+        # so the cheap platform and event type checks are done first
+        event_type = event.type()
+
+        if IS_WINDOWS and event_type == QEvent.Type.Wheel and event.angleDelta().y() != 0:
+            # Handle zooming on Windows. Every vertical delta is accumulated, including the small deltas
+            # of high resolution wheels and touchpads
+            self.wheel_delta_counter += event.angleDelta().y()
+
+            # Only zoom for every full notch that was accumulated (truncated towards zero for both directions)
+            steps = int(self.wheel_delta_counter / self.wheel_delta_threshold)
+            if steps != 0:
+                self.zoomUnderMouse(steps)
+
+                self.wheel_delta_counter -= steps * self.wheel_delta_threshold
+
+            # (Re)start the timer that discards the leftover delta once the user pauses scrolling
+            self.wheel_reset_timer.start()
 
             # Return True to accept the event
             return True
 
-        elif isinstance(event, QNativeGestureEvent) and sys.platform == 'darwin' \
+        elif IS_MACOS and event_type == QEvent.Type.NativeGesture \
                 and event.gestureType() == Qt.NativeGestureType.ZoomNativeGesture:
             # Handle zooming on macOS if the Gesture was a ZoomGesture
             if event.gestureType() == Qt.NativeGestureType.BeginNativeGesture:
@@ -135,9 +188,7 @@ class CanvasView(QGraphicsView):
 
             # Check if the zoom value counter has reached the threshold to zoom a step
             if abs(self.zoom_value_counter) >= self.zoom_value_threshold:
-                self.setTransformationAnchor(QGraphicsView.ViewportAnchor.AnchorUnderMouse)
-                self.zoom += 1 if self.zoom_value_counter > 0 else -1
-                self.setTransformationAnchor(QGraphicsView.ViewportAnchor.AnchorViewCenter)
+                self.zoomUnderMouse(1 if self.zoom_value_counter > 0 else -1)
 
                 # Reset the zoom value counter
                 self.zoom_value_counter = 0
@@ -147,13 +198,51 @@ class CanvasView(QGraphicsView):
 
         return super().viewportEvent(event)
 
+    def zoomUnderMouse(self, steps: int) -> None:
+        """
+        Zooms the given number of steps towards the point under the mouse instead of the view center.
+
+        :param steps: The number of zoom levels to zoom in (positive) or out (negative)
+        """
+        self.setTransformationAnchor(QGraphicsView.ViewportAnchor.AnchorUnderMouse)
+        self.zoom += steps
+        self.setTransformationAnchor(QGraphicsView.ViewportAnchor.AnchorViewCenter)
+
+    @pyqtSlot()
+    def resetWheelDeltaCounter(self) -> None:
+        """
+        Discards the accumulated wheel delta that did not add up to a full zoom step.
+        """
+        self.wheel_delta_counter = 0
+
+    @pyqtSlot()
+    def applyPendingZoomSteps(self) -> None:
+        """
+        Applies the zoom steps collected from auto repeated key presses in one go.
+        """
+        steps = self.pending_zoom_steps
+        self.pending_zoom_steps = 0
+
+        if steps:
+            self.zoom += steps
+
     def keyPressEvent(self, event: QKeyEvent):
         super().keyPressEvent(event)
 
         if event.key() == Qt.Key.Key_Plus:
-            self.zoom += 1
+            step = 1
         elif event.key() == Qt.Key.Key_Minus:
-            self.zoom -= 1
+            step = -1
+        else:
+            return
+
+        if event.isAutoRepeat():
+            # Collect the steps of a held key and apply them with the next timeout
+            self.pending_zoom_steps += step
+            if not self.key_zoom_timer.isActive():
+                self.key_zoom_timer.start()
+        else:
+            self.zoom += step
 
     @property
     def zoom(self) -> int:
@@ -164,6 +253,17 @@ class CanvasView(QGraphicsView):
         """
         Zooms the view to the specified zoom level.
         """
+        self.setZoom(zoom)
+
+    @pyqtSlot(int)
+    def setZoom(self, zoom: int) -> None:
+        """
+        Sets the zoom level to the given value
+        This function needs to be called to set the zoom level from outside this class as a slot.
+        The zoom property delegates to this method, so the zooming logic is only implemented here.
+
+        :param zoom: The zoom level to set
+        """
         # Check if the view is frozen and return if it is because zooming is disabled when frozen
         if self.freeze:
             return
@@ -175,29 +275,22 @@ class CanvasView(QGraphicsView):
             if zoom > self.zoom_range[1]:
                 zoom = self.zoom_range[1]
 
+        # Nothing to do if the zoom level does not change (e.g. when zooming further at the end of the zoom range)
+        # Scaling by 1 would still mark the view as changed and trigger a repaint
+        if zoom == self._zoom:
+            return
+
         # Calculate how many steps to zoom in/out
-        diff = self._zoom - zoom
+        steps = zoom - self._zoom
 
-        # Calculate zoom factor/the amount to zoom in
-        if diff > 0:
-            zoom_factor = (1 / self.zoom_factor) ** diff
-        elif diff < 0:
-            zoom_factor = self.zoom_factor ** -diff
-        else:
-            zoom_factor = 1
+        # Look up the zoom factor/the amount to zoom in
+        # Without clamping the steps can exceed the precomputed range, so it is calculated in that case
+        zoom_factor = self.zoom_factors.get(steps)
+        if zoom_factor is None:
+            zoom_factor = self.zoom_factor ** steps
 
         # Do the zooming
         self.scale(zoom_factor, zoom_factor)
 
         # Update the value and slider
         self._zoom = zoom
-
-    def setZoom(self, zoom: int) -> None:
-        """
-        Sets the zoom level to the given value
-        This function needs to be called to set the zoom level from outside this class as a slot
-
-        :param zoom: The zoom level to set
-        """
-        self.zoom = zoom
-
@@ -1,6 +1,7 @@
 import os
 import shutil
 import json
+from functools import partial
 from typing import Tuple
 
 from PyQt6.QtWidgets import QStackedWidget, QWidget, QVBoxLayout, QFormLayout, QPushButton, QLabel, QDialog, QLineEdit, QFileDialog, QProgressDialog, QSizePolicy
@@ -19,6 +20,10 @@ GENERATE_WIDGET = 1
 EXISTING_CONFIG_WIDGET = 2
 EXISTING_DATA_WIDGET = 3
 
+# The dialogs are only used to pick paths, so they do not need write access or resolved symlinks.
+# This keeps the native dialogs from loading shell extensions and resolving links on slow (network) drives
+FILE_DIALOG_OPTIONS = QFileDialog.Option.ReadOnly | QFileDialog.Option.DontResolveSymlinks
+
 
 class ConfigDialog(QDialog):
     """
@@ -100,14 +105,28 @@ class VerticalWidget(BaseWidget):
         :param index: The index the button should change to
         """
         button = QPushButton(text)
-        button.clicked.connect(lambda: self.change_widget.emit(index))
+        button.clicked.connect(partial(self.handleNavButtonClick, index))
 
         self.layout.addWidget(button)
 
+    def handleNavButtonClick(self, index: int, checked: bool=False) -> None:
+        """
+        Emits the change_widget signal with the index bound to the clicked navigation button.
+
+        :param index: The index the button should change to
+        :param checked: The checked state passed by the clicked signal (unused)
+        """
+        self.change_widget.emit(index)
+
 class VerticalInputWidget(VerticalWidget):
     """
     This class is a base class for all the widgets that are used in the ConfigWidget that have a vertical layout and contain input fields.
     """
+
+    # The icon of the buttons opening the file/directory dialogs.
+    # It is shared between all inputs and only created once the first input is added (a QIcon needs a running QApplication)
+    folder_icon: QIcon = None
+
     def __init__(self, index: int, title: str=''):
         super().__init__(index)
 
@@ -120,6 +139,16 @@ class VerticalInputWidget(VerticalWidget):
         self.layout.addWidget(self.title)
         self.layout.addLayout(self.input_layout)
 
+    @classmethod
+    def getFolderIcon(cls) -> QIcon:
+        """
+        Returns the shared folder icon and loads it on the first call.
+        """
+        if cls.folder_icon is None:
+            cls.folder_icon = QIcon(f'{ROOT_PATH}/gui/icons/FolderIcon.svg')
+
+        return cls.folder_icon
+
     def addFileInput(self, placeholder: str='', dialog_text: str='Select File', filter: str='', directory: str='') -> Tuple[QPushButton, QLineEdit]:
         """
         Adds a file input consisting of a button and a lineedit to the input_layout.
@@ -135,13 +164,8 @@ class VerticalInputWidget(VerticalWidget):
         line_edit.setPlaceholderText(placeholder)
         line_edit.setSizePolicy(QSizePolicy.Policy.Expanding, QSizePolicy.Policy.Preferred)
 
-        def handleButtonClick():
-            file_name, _ = QFileDialog.getOpenFileName(self, dialog_text, directory, filter)
-            line_edit.setText(file_name)
-
-        button = QPushButton(QIcon(f'{ROOT_PATH}/gui/icons/FolderIcon.svg'), '')
-        button.clicked.connect(handleButtonClick)
-
+        button = QPushButton(self.getFolderIcon(), '')
+        button.clicked.connect(partial(self.handleFileButtonClick, line_edit, dialog_text, directory, filter))
 
         self.input_layout.addRow(button, line_edit)
 
@@ -160,17 +184,42 @@ class VerticalInputWidget(VerticalWidget):
         line_edit.setPlaceholderText(placeholder)
         line_edit.setSizePolicy(QSizePolicy.Policy.Expanding, QSizePolicy.Policy.Preferred)
 
-        def handleButtonClick():
-            directory = QFileDialog.getExistingDirectory(self, dialog_text)
-            line_edit.setText(directory)
-
-        button = QPushButton(QIcon(f'{ROOT_PATH}/gui/icons/FolderIcon.svg'), '')
-        button.clicked.connect(handleButtonClick)
+        button = QPushButton(self.getFolderIcon(), '')
+        button.clicked.connect(partial(self.handleDirectoryButtonClick, line_edit, dialog_text))
 
         self.input_layout.addRow(button, line_edit)
 
         return button, line_edit
 
+    def handleFileButtonClick(self, line_edit: QLineEdit, dialog_text: str, directory: str, filter: str,
+                              checked: bool=False) -> None:
+        """
+        Opens a file dialog and shows the selected path in the given lineedit.
+        The arguments are bound with functools.partial when the file input is created.
+
+        :param line_edit: The lineedit that shows the path of the selected file
+        :param dialog_text: The window title of the file dialog
+        :param directory: The directory the file dialog should open in
+        :param filter: The filter of the file dialog
+        :param checked: The checked state passed by the clicked signal (unused)
+        """
+        file_name, _ = QFileDialog.getOpenFileName(self, dialog_text, directory, filter,
+                                                   options=FILE_DIALOG_OPTIONS)
+        line_edit.setText(file_name)
+
+    def handleDirectoryButtonClick(self, line_edit: QLineEdit, dialog_text: str, checked: bool=False) -> None:
+        """
+        Opens a directory dialog and shows the selected path in the given lineedit.
+        The arguments are bound with functools.partial when the directory input is created.
+
+        :param line_edit: The lineedit that shows the path of the selected directory
+        :param dialog_text: The window title of the directory dialog
+        :param checked: The checked state passed by the clicked signal (unused)
+        """
+        directory = QFileDialog.getExistingDirectory(self, dialog_text,
+                                                     options=FILE_DIALOG_OPTIONS | QFileDialog.Option.ShowDirsOnly)
+        line_edit.setText(directory)
+
 class InitialWidget(VerticalWidget):
     """
     This is the widget that is shown initially when the user opens the ConfigDialog.
@@ -250,25 +299,15 @@ class GenerateWidget(VerticalInputWidget):
         if not name:
             name = 'dataset'
 
-        if meta_file:
-            # Try to preprocess the meta file
-            try:
-                default_preprocessing(meta_file, images_dir, f'{output_dir}/{name}_meta_data.csv')
-            except:
-                copyFile(meta_file, f'{output_dir}/{name}_meta_data.csv')
-        else:
-            # If no meta file is given create an empty one
-            # Since the search requires a meta file containing an "encoding_id" we add a dummy one
-            empty_meta_file = open(f'{output_dir}/{name}_meta_data.csv', 'w')
-            empty_meta_file.write('encoding_id\n-1')
-            empty_meta_file.close()
-
         # Create the config file
-        json.dump({
+        # Serialize the config first and write it at once, so the file is closed before the dataset is used
+        config = json.dumps({
             'info_path': f'{output_dir}/{name}_info.hdf5',
             'encodings_path': f'{output_dir}/{name}_CLIP.hdf5',
-            'meta_path': f'{output_dir}/{name}_meta_data.csv'},
-            open(f'{ROOT_PATH}/dataset/config.json', 'w'))
+            'meta_path': f'{output_dir}/{name}_meta_data.csv'})
+
+        with open(f'{ROOT_PATH}/dataset/config.json', 'w') as config_file:
+            config_file.write(config)
 
         # Create the progress bar
         self.progress_bar = QProgressDialog(self)
@@ -277,15 +316,19 @@ class GenerateWidget(VerticalInputWidget):
         self.progress_bar.show()
 
         # Delete old dataset if it exists
-        if os.path.isfile(f'{output_dir}/{name}_info.hdf5'):
-            os.remove(f'{output_dir}/{name}_info.hdf5')
-        if os.path.isfile(f'{output_dir}/{name}_CLIP.hdf5'):
-            os.remove(f'{output_dir}/{name}_CLIP.hdf5')
+        # Removing directly (instead of checking first) only needs one file system access per file
+        for old_file in [f'{output_dir}/{name}_info.hdf5', f'{output_dir}/{name}_CLIP.hdf5']:
+            try:
+                os.remove(old_file)
+            except FileNotFoundError:
+                pass
 
         # Use a thread to generate the dataset so the progress bar can be updated while generating
         # Otherwise the generate script would block the QT event loop
         # It is also necessary to store it in self, so it does not get garbage collected
-        self.generate_thread = GenerateThread(images_dir, f'{output_dir}/', batch_size=50, output_name=name)
+        # The meta file is preprocessed in the thread as well, since this can take a while for large files
+        self.generate_thread = GenerateThread(images_dir, f'{output_dir}/', batch_size=50, output_name=name,
+                                              meta_file=meta_file, meta_output_file=f'{output_dir}/{name}_meta_data.csv')
         self.generate_thread.starting.connect(self.progress_bar.setMaximum)
         self.generate_thread.valueChanged.connect(self.progress_bar.setValue)
         self.generate_thread.finished.connect(self.close_dialog.emit)
@@ -397,16 +440,18 @@ class ExistingDataWidget(VerticalInputWidget):
         else:
             # If no meta file is given create an empty one
             # Since the search requires a meta file containing an "encoding_id" we add a dummy one
-            empty_meta_file = open(f'{output_dir}/{name}_meta_data.csv', 'w')
-            empty_meta_file.write('encoding_id\n-1')
-            empty_meta_file.close()
+            with open(f'{output_dir}/{name}_meta_data.csv', 'w') as empty_meta_file:
+                empty_meta_file.write('encoding_id\n-1')
 
         # Create the config file
-        json.dump({
+        # Serialize the config first and write it at once, so the file is closed before the dataset is used
+        config = json.dumps({
             'info_path': f'{output_dir}/{name}_info.hdf5',
             'encodings_path': f'{output_dir}/{name}_CLIP.hdf5',
-            'meta_path': f'{output_dir}/{name}_meta_data.csv'},
-            open(f'{ROOT_PATH}/dataset/config.json', 'w'))
+            'meta_path': f'{output_dir}/{name}_meta_data.csv'})
+
+        with open(f'{ROOT_PATH}/dataset/config.json', 'w') as config_file:
+            config_file.write(config)
 
         self.close_dialog.emit(True)
 
@@ -420,21 +465,67 @@ class GenerateThread(QThread):
     finished = pyqtSignal(bool)
     valueChanged = pyqtSignal(int)
 
-    def __init__(self, images_dir: str, output_dir: str, batch_size: int, output_name: str):
+    def __init__(self, images_dir: str, output_dir: str, batch_size: int, output_name: str,
+                 meta_file: str, meta_output_file: str):
         super().__init__()
 
         self.images_dir = images_dir
         self.output_dir = output_dir
         self.batch_size = batch_size
         self.output_name = output_name
+        self.meta_file = meta_file
+        self.meta_output_file = meta_output_file
+
+        # The progress is only forwarded to the GUI thread in steps of roughly 0.5% of the total,
+        # since every emitted value is queued to the GUI thread and repaints the progress bar
+        self.total = 0
+        self.report_interval = 1
+        self.last_reported_value = 0
 
     def run(self) -> None:
         """
         This method is called when the thread is started.
-        It just calls the generate_dataset function from the generate script.
+        It prepares the meta data file and then calls the generate_dataset function from the generate script.
         """
+        if self.meta_file:
+            # Try to preprocess the meta file
+            try:
+                default_preprocessing(self.meta_file, self.images_dir, self.meta_output_file)
+            except:
+                copyFile(self.meta_file, self.meta_output_file)
+        else:
+            # If no meta file is given create an empty one
+            # Since the search requires a meta file containing an "encoding_id" we add a dummy one
+            with open(self.meta_output_file, 'w') as empty_meta_file:
+                empty_meta_file.write('encoding_id\n-1')
+
         generate_dataset(image_dir=self.images_dir,
                          output_dir=self.output_dir,
                          batch_size=self.batch_size,
                          output_name=self.output_name,
                          thread=self)
+
+    def reportStart(self, total: int) -> None:
+        """
+        Called by the generate script before the images are processed.
+
+        :param total: The number of images that will be processed
+        """
+        self.total = total
+        self.report_interval = max(1, total // 200)
+        self.last_reported_value = 0
+
+        self.starting.emit(total)
+
+    def reportProgress(self, value: int) -> None:
+        """
+        Called by the generate script after each batch.
+        The value is only emitted if it advanced far enough since the last emitted value or the generation is done.
+
+        :param value: The number of images processed so far
+        """
+        if value - self.last_reported_value < self.report_interval and value < self.total:
+            return
+
+        self.last_reported_value = value
+        self.valueChanged.emit(value)
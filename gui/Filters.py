@@ -1,7 +1,8 @@
+from functools import partial
 from typing import List, Tuple
 
 from PyQt6.QtWidgets import QWidget, QFormLayout, QLineEdit, QPushButton
-from PyQt6.QtCore import pyqtSignal
+from PyQt6.QtCore import pyqtSignal, pyqtSlot
 from PyQt6.QtGui import QCloseEvent
 
 from SearchEngine import METASearch
@@ -21,6 +22,8 @@ class FilterWindow(QWidget):
 
         self.artsearch = artsearch
         self.filters = {}  # Store the line edits where the user enters the filters for each key in this dictionary
+        self.active_filters = set()  # The keys of all line edits that currently contain a filter
+        self.filters_cache = None  # The filters extracted from the line edits, None if a line edit changed since
 
         self.initUI()
 
@@ -36,6 +39,9 @@ class FilterWindow(QWidget):
                 line_edit = QLineEdit()
                 self.filters[key] = line_edit
 
+                # Keep track of the active filters and the changes, so the line edits don't have to be checked each time
+                line_edit.textChanged.connect(partial(self.filterChanged, key))
+
                 self.layout.addRow(key, line_edit)
 
         # Add button to clear all the filters
@@ -49,6 +55,7 @@ class FilterWindow(QWidget):
         self.layout.addWidget(self.close_button)
         self.layout.addWidget(self.clear_button)
 
+    @pyqtSlot()
     def clear(self) -> None:
         """
         Clears all the line edits of the filters
@@ -56,6 +63,21 @@ class FilterWindow(QWidget):
         for line_edit in self.filters.values():
             line_edit.setText('')
 
+    def filterChanged(self, key: str, text: str) -> None:
+        """
+        Updates the set of active filters when the text of a line edit changes
+        and invalidates the extracted filters
+
+        :param key: The key (metadata column) of the line edit that changed
+        :param text: The new text of the line edit
+        """
+        if text:
+            self.active_filters.add(key)
+        else:
+            self.active_filters.discard(key)
+
+        self.filters_cache = None
+
     def closeEvent(self, event: QCloseEvent) -> None:
         """
         Emits the closing signal before closing the window
@@ -68,9 +90,13 @@ class FilterWindow(QWidget):
 
     def extractFilters(self) -> List[Tuple[str, str]]:
         """
-        Extracts the filters from the line edits and returns them as a list of tuples (key, value)
+        Extracts the filters from the line edits and returns them as a list of tuples (key, value).
+        The filters are only extracted again, if a line edit changed since the last call
         """
-        return [(key, line_edit.text()) for key, line_edit in self.filters.items()]
+        if self.filters_cache is None:
+            self.filters_cache = [(key, line_edit.text()) for key, line_edit in self.filters.items()]
+
+        return list(self.filters_cache)
 
     def getActive(self) -> bool:
         """
@@ -78,7 +104,4 @@ class FilterWindow(QWidget):
 
         :return: True if there are any filters, False otherwise
         """
-        for line_edit in self.filters.values():
-            if line_edit.text():
-                return True
-        return False
+        return bool(self.active_filters)
@@ -1,13 +1,15 @@
-from typing import List, Dict, Any, Optional
+from functools import partial
+from typing import List, Dict, Any, Optional, Tuple
 
 from PyQt6.QtWidgets import QMenu, QGraphicsTextItem, QGraphicsSceneMouseEvent, QColorDialog, QStyleOptionGraphicsItem
-from PyQt6.QtCore import Qt, pyqtSlot
+from PyQt6.QtCore import Qt, QEvent, QElapsedTimer, QTimer, pyqtSlot
 from PyQt6.QtGui import QPen, QPainterPath, QIcon, QPixmap, QFont, QFontMetricsF, QKeyEvent, QFocusEvent
 
 from gui.Colors import *
 from gui.HandleGraphicsItem import *
 from gui.ImageGraphicsItem import ImageGraphicsItem
 from gui.Note import Note
+from gui.Util import EMPTY_ICON
 
 
 class Group(HandleGraphicsItem):
@@ -15,10 +17,27 @@ class Group(HandleGraphicsItem):
     A group on the canvas that can group multiple items on the canvas together.
     Each group has a corresponding group in the artsearch class to keep track of the items in the group and update the search.
     """
+
+    # Minimum time in ms between two updates of the content while the group is moved or scaled (~60 updates per second)
+    throttle_interval = 16
+
+    # Most groups never open their context menu, so it is only created when it is requested
+    lazy_context_menu = True
+
+    # The predefined colors in the context menu with their names
+    color_options = ((QColor(BLACK), 'Black'), (QColor(RED), 'Red'), (QColor(GREEN), 'Green'), (QColor(BLUE), 'Blue'))
+
+    # Icons of the color options in the context menu, shared by all groups and keyed by the color name
+    color_icons: Dict[str, QIcon] = {}
+
+    # The dashed border pens, shared by all groups with the same color and keyed by the color name.
+    # The pens are never modified, changing the color of a group replaces its pen
+    pens: Dict[str, QPen] = {}
+
     def __init__(self):
         super().__init__()
 
-        self.pen = QPen(Qt.GlobalColor.black, 2, Qt.PenStyle.DashLine)
+        self.pen = self.getPen(QColor(BLACK))
         self.setZValue(2 + 9999)  # Groups should always be on top of everything else to see their border
 
         # Create the group name text item and set its parent to the top left corner to make it move with the corner
@@ -30,10 +49,26 @@ class Group(HandleGraphicsItem):
         # This is necessary because the process of moving and scaling is split up into multiple events
         # (Press, Move, Release)
         # For scale_items the relative position of the item to the group is also stored
-        self.move_items: [QGraphicsItem] = []
+        self.move_items: Tuple[QGraphicsItem, ...] = ()
         self.scale_items: [(QGraphicsItem, QPointF)] = []
 
-        self.initContextMenu()
+        # Mouse move events can arrive much faster than the screen refreshes.
+        # Therefore, the movement is accumulated and only applied to the content once per throttle interval
+        # and when the mouse is released. The timer only runs while the group itself is moved or scaled with the mouse
+        self.throttle_timer = QElapsedTimer()
+        self.pending_move_diff = QPointF()
+        self.pending_scale_diff = QPointF()
+        self.last_scale_diff = QPointF()
+
+        # If the mouse stops before the throttle interval passed, the accumulated movement/scaling is applied by this
+        # timer, so the content does not stay behind the group. Groups are no QObjects, so the timer has no parent
+        self.flush_timer = QTimer()
+        self.flush_timer.setSingleShot(True)
+        self.flush_timer.timeout.connect(self.applyPendingChanges)
+
+        # The last shape and the geometry (handle positions and size) it was built for
+        self.shape_key: Optional[tuple] = None
+        self.shape_cache: Optional[QPainterPath] = None
 
     def initContextMenu(self) -> None:
         """
@@ -43,20 +78,46 @@ class Group(HandleGraphicsItem):
 
         color_menu = self.context_menu.addMenu('Change Color')
 
-        # Simple function to add a color option to the color menu
-        def addColor(color: QColor, name: str):
+        # Add the predefined colors to the color menu
+        for color, name in self.color_options:
+            action = color_menu.addAction(self.getColorIcon(color), name)
+            action.triggered.connect(partial(self.setColor, color))
+
+        custom_action = color_menu.addAction(EMPTY_ICON, 'Custom')
+        custom_action.triggered.connect(self.setCustomColor)
+
+    @classmethod
+    def getColorIcon(cls, color: QColor) -> QIcon:
+        """
+        Returns the icon showing the given color. The icon is only created once for each color.
+
+        :param color: The color of the icon
+        :return: The icon filled with the color
+        """
+        icon = cls.color_icons.get(color.name())
+        if icon is None:
             pixmap = QPixmap(20, 20)
             pixmap.fill(color)
-            action = color_menu.addAction(QIcon(pixmap), name)
-            action.triggered.connect(lambda: self.setColor(color))
 
-        addColor(QColor(BLACK), 'Black')
-        addColor(QColor(RED), 'Red')
-        addColor(QColor(GREEN), 'Green')
-        addColor(QColor(BLUE), 'Blue')
+            icon = QIcon(pixmap)
+            cls.color_icons[color.name()] = icon
 
-        custom_action = color_menu.addAction(QIcon(''), 'Custom')
-        custom_action.triggered.connect(self.setCustomColor)
+        return icon
+
+    @classmethod
+    def getPen(cls, color: QColor) -> QPen:
+        """
+        Returns the (shared) pen for the border of a group with the given color.
+
+        :param color: The color of the group
+        :return: The dashed pen with the color
+        """
+        pen = cls.pens.get(color.name())
+        if pen is None:
+            pen = QPen(color, 2, Qt.PenStyle.DashLine)
+            cls.pens[color.name()] = pen
+
+        return pen
 
     def shape(self) -> QPainterPath:
         """
@@ -65,23 +126,39 @@ class Group(HandleGraphicsItem):
         This is done so that the group can be selected by clicking on the border of the group.
         Otherwise, the items in the group would not be selectable because the group would be selected instead.
         """
+        top_left = self.handles[TOP_LEFT].pos()
+        bottom_right = self.handles[BOTTOM_RIGHT].pos()
+        handle_size = self.getHandleSize()
+
+        # Hit tests call shape() even if the group did not change, so the path is only built again if the geometry changed
+        shape_key = (top_left.x(), top_left.y(), bottom_right.x(), bottom_right.y(), handle_size)
+        if shape_key == self.shape_key:
+            return self.shape_cache
+
+        # With the odd-even fill rule the inner rectangle is a hole in the outer one.
+        # This avoids the boolean path operation of subtracted()
         path = QPainterPath()
-        path.addRect(QRectF(self.handles[TOP_LEFT].pos(),
-                            self.handles[BOTTOM_RIGHT].pos() + QPointF(self.getHandleSize(), self.getHandleSize())))
+        path.setFillRule(Qt.FillRule.OddEvenFill)
 
-        # Subtract the inside of the group from the shape
-        subtract = QPainterPath()
-        subtract.addRect(QRectF(self.handles[TOP_LEFT].pos() + QPointF(self.getHandleSize(), self.getHandleSize()),
-                                self.handles[BOTTOM_RIGHT].pos()))
+        path.addRect(QRectF(top_left, bottom_right + QPointF(handle_size, handle_size)))
 
-        return path.subtracted(subtract)
+        # The inside of the group that is not part of the shape
+        path.addRect(QRectF(top_left + QPointF(handle_size, handle_size), bottom_right))
+
+        self.shape_key = shape_key
+        self.shape_cache = path
+
+        return path
 
     def mousePressEvent(self, event: QGraphicsSceneMouseEvent) -> None:
         """
         Override the mousePressEvent to keep track of which items should be moved with the group.
         """
         if event.button() == Qt.MouseButton.LeftButton and event.modifiers() != Qt.KeyboardModifier.ShiftModifier:
-            self.move_items = self.getContent()
+            # The content does not change during the move, so it is stored as a tuple
+            self.move_items = tuple(self.getContent())
+            self.pending_move_diff = QPointF()
+            self.throttle_timer.start()
 
         super().mousePressEvent(event)
 
@@ -91,11 +168,13 @@ class Group(HandleGraphicsItem):
         """
         if event.buttons() == Qt.MouseButton.LeftButton:
             # Determine the amount the group has been moved
-            diff = event.pos() - event.lastPos()
+            self.pending_move_diff += event.pos() - event.lastPos()
 
-            # Move all the items in the group
-            for item in self.move_items:
-                item.moveBy(diff.x(), diff.y())
+            # Move all the items in the group (at most once per throttle interval)
+            if self.throttleIntervalPassed():
+                self.applyPendingMove()
+            else:
+                self.scheduleFlush()
 
         super().mouseMoveEvent(event)
 
@@ -105,16 +184,83 @@ class Group(HandleGraphicsItem):
         when one move action is finished
         """
         if event.button() == Qt.MouseButton.LeftButton:
-            self.move_items = []
+            # Apply the remaining movement before the scene is notified about the move
+            self.applyPendingMove()
+            self.move_items = ()
+            self.throttle_timer.invalidate()
+            self.flush_timer.stop()
 
         super().mouseReleaseEvent(event)
 
+    def throttleIntervalPassed(self) -> bool:
+        """
+        Returns whether the accumulated movement/scaling should be applied to the content now.
+        The timer is only running while the group itself is moved or scaled with the mouse.
+        If the group is scaled by a parent group, the timer is not running and the scaling is always applied,
+        since the parent group already throttles it.
+        """
+        return not self.throttle_timer.isValid() or self.throttle_timer.hasExpired(self.throttle_interval)
+
+    def restartThrottleTimer(self) -> None:
+        """
+        Starts the next throttle interval after the accumulated movement/scaling was applied.
+        The timer is not started if it is not running, so scaling by a parent group is never throttled.
+        """
+        if self.throttle_timer.isValid():
+            self.throttle_timer.restart()
+
+    def scheduleFlush(self) -> None:
+        """
+        Starts the flush timer, which applies the deferred movement/scaling once the current throttle interval passed.
+        The timer is not restarted if it is already running, otherwise moving the mouse would keep delaying it.
+        """
+        if not self.flush_timer.isActive():
+            self.flush_timer.start(max(0, self.throttle_interval - self.throttle_timer.elapsed()))
+
+    def applyPendingChanges(self) -> None:
+        """
+        Applies the deferred movement/scaling when the flush timer times out.
+        """
+        # The group might have been removed while the timer was running
+        if self.scene() is None:
+            return
+
+        if not self.pending_move_diff.isNull():
+            self.applyPendingMove()
+
+        if not self.pending_scale_diff.isNull():
+            # There is no mouse event when the timer times out. The scaled items only need it to be passed on,
+            # and nested groups don't add any scaling of their own for an event without pressed buttons
+            self.applyPendingScale(QGraphicsSceneMouseEvent(QEvent.Type.GraphicsSceneMouseMove))
+
+    def applyPendingMove(self) -> None:
+        """
+        Moves the items in the group by the movement accumulated since the last call.
+        """
+        diff = self.pending_move_diff
+        self.pending_move_diff = QPointF()
+        self.restartThrottleTimer()
+        self.flush_timer.stop()
+
+        if diff.isNull():
+            return
+
+        # The items don't set ItemSendsGeometryChanges, so moving them does not send itemChange notifications
+        # and Qt updates the index of the scene for all of them at once
+        dx, dy = diff.x(), diff.y()
+        for item in self.move_items:
+            item.moveBy(dx, dy)
+
     def handlePressed(self, position: int, event: QGraphicsSceneMouseEvent) -> None:
         """
         Override handlePressed to determine which items should be scaled with the group.
         """
         super().handlePressed(position, event)
 
+        self.pending_scale_diff = QPointF()
+        self.last_scale_diff = QPointF()
+        self.throttle_timer.start()
+
         # Determine which items should be scaled with the group and their relative position to the group
         if event.button() == Qt.MouseButton.LeftButton and event.modifiers() == Qt.KeyboardModifier.ShiftModifier:
             for item in self.getContent():
@@ -148,32 +294,74 @@ class Group(HandleGraphicsItem):
             elif position == BOTTOM_LEFT:
                 diff = QPointF(-diff.x(), diff.y())
 
+            self.pending_scale_diff += diff
+            self.last_scale_diff = diff
+
+        # Scale the content at most once per throttle interval
+        if self.throttleIntervalPassed():
+            self.applyPendingScale(event)
+        else:
+            self.scheduleFlush()
+
+    def applyPendingScale(self, event: QGraphicsSceneMouseEvent) -> None:
+        """
+        Scales the items that should be scaled with the group by the amount accumulated since the last call
+        and schedules an update of the size of the group name.
+
+        Since the ratio is calculated from the current size and the size before the accumulated change,
+        applying several changes at once results in the same size as applying them one by one.
+
+        :param event: The mouse event of the handle, that is passed on to the scaled items
+        """
+        diff = self.pending_scale_diff
+        self.pending_scale_diff = QPointF()
+        self.restartThrottleTimer()
+        self.flush_timer.stop()
+
+        if not diff.isNull():
+            # These values are the same for every item, so they are only calculated once
+            top_left = self.mapToScene(self.handles[TOP_LEFT].pos())
+            left, top = top_left.x(), top_left.y()
+            width, height = self.getWidth(), self.getHeight()
+            offset_x, offset_y = self.last_scale_diff.x(), self.last_scale_diff.y()
+
+            # Ratio between the new size and the size before the accumulated change
+            ratio_x = width / (width - diff.x())
+            ratio_y = height / (height - diff.y())
+
+            # Every scaled item requests an update of the scene, which are combined into a single one
+            self.scene().deferUpdates()
+
             for item, relative_position_percentage in self.scale_items:
 
                 # Calculate new absolute position based on the relative position to the group
-                pos = self.mapToScene(self.handles[TOP_LEFT].pos())
-                pos += QPointF(relative_position_percentage.x() * self.getWidth() + diff.x(),
-                               relative_position_percentage.y() * self.getHeight() + diff.y())
-
-                item.setPos(pos)
+                item.setPos(left + relative_position_percentage.x() * width + offset_x,
+                            top + relative_position_percentage.y() * height + offset_y)
 
                 # Calculate new size
-                ratio = QPointF(self.getWidth() / (self.getWidth() - diff.x()),
-                                self.getHeight() / (self.getHeight() - diff.y()))
-
-                item.handles[BOTTOM_RIGHT].setPos(item.handles[BOTTOM_RIGHT].pos().x() * ratio.x(),
-                                                  item.handles[BOTTOM_RIGHT].pos().y() * ratio.y())
+                handle = item.handles[BOTTOM_RIGHT]
+                handle_pos = handle.pos()
+                handle.setPos(handle_pos.x() * ratio_x, handle_pos.y() * ratio_y)
 
                 item.handleMoving(BOTTOM_RIGHT, event)
 
-        # Update the text size of the group name when the group is scaled
-        self.group_name.updateSize()
+            self.scene().resumeUpdates()
+
+        # Update the text size of the group name when the group is scaled.
+        # This only happens once the scaling pauses, handleReleased updates it directly
+        self.group_name.scheduleUpdateSize()
 
     def handleReleased(self, position: int, event: QGraphicsSceneMouseEvent) -> None:
         """
         Override handleReleased to clear the list of items that should be scaled with the group.
         And notify all the scaled items, that the scaling is finished.
         """
+        # Apply the remaining scaling before the handles are normalized and the scene is notified
+        self.applyPendingScale(event)
+        self.group_name.updateSize()
+        self.throttle_timer.invalidate()
+        self.flush_timer.stop()
+
         super().handleReleased(position, event)
 
         # Clear the list of items that should be scaled with the group
@@ -189,26 +377,24 @@ class Group(HandleGraphicsItem):
         Returns all the items that the group fully contains
         :return: List of items that the group fully contains
         """
-        content = []
-
         # Go through all the items in the scene and check if they are inside the group
         group_mapped_bounding_rect = self.mapRectToScene(self.boundingRect())
-        for item in self.scene().items(group_mapped_bounding_rect, mode=Qt.ItemSelectionMode.ContainsItemBoundingRect):
-            if item is self:
-                continue
-            if isinstance(item, Group) or isinstance(item, ImageGraphicsItem) or isinstance(item, Note):
-                content.append(item)
+        items = self.scene().items(group_mapped_bounding_rect, mode=Qt.ItemSelectionMode.ContainsItemBoundingRect)
 
-        return content
+        return [item for item in items if item is not self and isinstance(item, CONTENT_TYPES)]
 
-    def getImages(self) -> List[ImageGraphicsItem]:
+    def getImages(self, content: Optional[List[QGraphicsItem]] = None) -> List[ImageGraphicsItem]:
         """
         Returns all the images that the group fully contains, by filtering the content of the group
+        :param content: The content of the group, if it is already known. Otherwise, it is determined with getContent
         :return: List of images that the group fully contains
         """
+        if content is None:
+            content = self.getContent()
+
         images = []
 
-        for item in self.getContent():
+        for item in content:
             if isinstance(item, ImageGraphicsItem):
                 images.append(item)
 
@@ -222,11 +408,17 @@ class Group(HandleGraphicsItem):
             self.scene().removeGroup(self)
 
 
-    def setColor(self, color) -> None:
+    def setColor(self, color, checked: bool=False) -> None:
+        """
+        Sets the color of the group
+
+        :param color: The new color, either a QColor or a color string
+        :param checked: The checked state passed by the triggered signal of the color menu (unused)
+        """
         if isinstance(color, str):
             color = QColor(color)
 
-        self.pen.setColor(color)
+        self.pen = self.getPen(color)
         self.setHandleColor(color)
 
     def setCustomColor(self) -> None:
@@ -257,25 +449,55 @@ class Group(HandleGraphicsItem):
         return super_dict
 
 
+# The types of items that can be part of a group (checked with a single isinstance call in Group.getContent)
+CONTENT_TYPES = (Group, ImageGraphicsItem, Note)
+
+
 class GroupName(QGraphicsTextItem):
     """
     This class is the name of the group that is displayed in the top corner of the group
     """
 
+    # Font metrics shared by all group names, keyed by QFont.key() (which includes the pixel size)
+    # Creating the metrics is not free, and all group names use the same font in only a few sizes
+    font_metrics: Dict[str, QFontMetricsF] = {}
+
+    # Time in ms without scaling after which the size of the text is updated
+    update_size_delay = 50
+
+    # The style of the line below the text, which is the same for all group names
+    pen = QPen(Qt.GlobalColor.black, 2, Qt.PenStyle.SolidLine)
+    brush = QBrush(Qt.GlobalColor.white)
+
     def __init__(self, parent: Group):
         super().__init__(parent)
 
         self.text = 'self.toPlainText()'  # The text that is displayed, initial value is not important
         self.font = self.font()
 
+        # The width of the full text is only measured again if the text or the font size changed
+        self.text_width_key: Tuple[int, str] = None
+        self.text_width: float = 0
+
+        # The text and the font size that are currently displayed, used to skip setting them again
+        self.displayed_text: Optional[str] = None
+        self.displayed_pixel_size: Optional[int] = None
+
+        # The font size, width and text of the last update, the displayed text only changes if one of them changes
+        # or the user edits the text (which resets it)
+        self.size_key: Optional[Tuple[int, float, str]] = None
+
+        # Laying out the text is expensive, so while the group is scaled the size is only updated when the scaling pauses
+        self.update_size_timer = QTimer(self)
+        self.update_size_timer.setSingleShot(True)
+        self.update_size_timer.setInterval(self.update_size_delay)
+        self.update_size_timer.timeout.connect(self.updateSize)
+
         # Set some flags to make the text behave like a normal text editor
         self.setTextInteractionFlags(Qt.TextInteractionFlag.TextEditorInteraction)
         self.setCursor(Qt.CursorShape.IBeamCursor)
         self.setZValue(self.parentItem().zValue() + 1)
 
-        self.pen = QPen(Qt.GlobalColor.black, 2, Qt.PenStyle.SolidLine)
-        self.brush = QBrush(Qt.GlobalColor.white)
-
         self.updateSize()
 
     def boundingRect(self) -> QRectF:
@@ -307,10 +529,13 @@ class GroupName(QGraphicsTextItem):
         if event.button() == Qt.MouseButton.LeftButton:
             if self.toPlainText() == 'New Group':
                 # If the text is the default text, clear it
-                self.setPlainText('')
+                self.displayed_text = ''
             else:
                 # Do this to show the full text if the processed text with "..." is shown
-                self.setPlainText(self.text)
+                self.displayed_text = self.text
+
+            self.setPlainText(self.displayed_text)
+            self.size_key = None
 
         super().mousePressEvent(event)
 
@@ -322,6 +547,8 @@ class GroupName(QGraphicsTextItem):
 
         # Store the new text
         self.text = self.toPlainText()
+        self.displayed_text = self.text
+        self.size_key = None
 
     def focusOutEvent(self, event: QFocusEvent) -> None:
         """
@@ -340,27 +567,77 @@ class GroupName(QGraphicsTextItem):
     def getText(self) -> str:
         return self.text
 
+    @classmethod
+    def getFontMetrics(cls, font: QFont) -> QFontMetricsF:
+        """
+        Returns the (cached) font metrics for the given font.
+        """
+        key = font.key()
+
+        metrics = cls.font_metrics.get(key)
+        if metrics is None:
+            metrics = QFontMetricsF(font)
+            cls.font_metrics[key] = metrics
+
+        return metrics
+
+    def scheduleUpdateSize(self) -> None:
+        """
+        Updates the size of the text after no further update was scheduled for update_size_delay ms.
+        This is used while the group is scaled
+        """
+        self.update_size_timer.start()
+
+    @pyqtSlot()
     def updateSize(self) -> None:
         """
         Update the size of the text and shorten it if it is too long.
         This is called whenever the text changes or the group is resized
         :return:
         """
+        # The size is updated now, so a scheduled update is not necessary anymore
+        self.update_size_timer.stop()
+
+        bounding_rect = self.boundingRect()
+        pixel_size = int(bounding_rect.height() // 2)
+        width = bounding_rect.width()
+
+        # Nothing has to be done if neither the size nor the text changed since the last update
+        size_key = (pixel_size, width, self.text)
+        if size_key == self.size_key:
+            return
+        self.size_key = size_key
+
         # Set the font size to half of the height of the bounding rect
-        self.font.setPixelSize(int(self.boundingRect().height() // 2))
+        self.font.setPixelSize(pixel_size)
+
+        metrics = self.getFontMetrics(self.font)
+
+        # If the text would fit even if every character was as wide as the widest one, it does not need to be measured.
+        # Otherwise, measure the text only if the text or the font size changed since the last measurement
+        if len(self.text) * metrics.maxWidth() <= width:
+            text_width = 0
+        elif self.text_width_key != (pixel_size, self.text):
+            self.text_width_key = (pixel_size, self.text)
+            self.text_width = text_width = metrics.horizontalAdvance(self.text)
+        else:
+            text_width = self.text_width
 
-        metrics = QFontMetricsF(self.font)
         # Check if the is longer than the width of the bounding rect
-        if metrics.horizontalAdvance(self.text) > self.boundingRect().width():
+        if text_width > width:
             # If it is, shorten the text and add '...' at the end
+            # Qt measures the actual characters, so the text is shortened exactly as much as needed
+            processed_text = metrics.elidedText(self.text, Qt.TextElideMode.ElideRight, width)
+        else:
+            # Since updateSize is called when the text is changed, the text is set to the full text if it fits
             processed_text = self.text
-            processed_text = processed_text[:int(self.boundingRect().width() / metrics.averageCharWidth())]
-            processed_text = processed_text[:-3] + '...'
 
+        # Setting the text or the font lays out the whole text again, so this is only done if something changed
+        if processed_text != self.displayed_text:
+            self.displayed_text = processed_text
             self.setPlainText(processed_text)
-        else:
-            # Since updateSize is called when the text is changed, the text is set to the full text if it fits
-            self.setPlainText(self.text)
 
         # Update the font (size)
-        self.setFont(self.font)
+        if pixel_size != self.displayed_pixel_size:
+            self.displayed_pixel_size = pixel_size
+            self.setFont(self.font)
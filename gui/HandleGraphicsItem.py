@@ -2,13 +2,20 @@ from typing import Dict, Any, Optional
 
 from PyQt6.QtWidgets import QGraphicsItem, QStyleOptionGraphicsItem, QWidget, QGraphicsSceneMouseEvent, QGraphicsDropShadowEffect, QMenu, QGraphicsSceneContextMenuEvent
 from PyQt6.QtCore import Qt, QRectF, QPointF, pyqtSlot
-from PyQt6.QtGui import QPainter, QPen, QBrush, QColor, QPainterPath, QIcon
+from PyQt6.QtGui import QPainter, QPen, QBrush, QColor, QPainterPath
+
+from gui.Util import EMPTY_ICON
 
 TOP_LEFT = 0
 TOP_RIGHT = 1
 BOTTOM_RIGHT = 2
 BOTTOM_LEFT = 3
 
+# For each handle position the handle that shares the x coordinate and the handle that shares the y coordinate
+# e.g. if the TOP_LEFT handle is moved, the BOTTOM_LEFT handle has to follow in x and the TOP_RIGHT handle in y direction
+SAME_X_HANDLE = (BOTTOM_LEFT, BOTTOM_RIGHT, TOP_RIGHT, TOP_LEFT)
+SAME_Y_HANDLE = (TOP_RIGHT, TOP_LEFT, BOTTOM_LEFT, BOTTOM_RIGHT)
+
 
 class HandleGraphicsItem(QGraphicsItem):
     """
@@ -19,6 +26,9 @@ class HandleGraphicsItem(QGraphicsItem):
 
     default_size = 200
 
+    # Whether the context menu is only created when it is requested for the first time instead of in the constructor
+    lazy_context_menu = False
+
     def __init__(self):
         super().__init__()
 
@@ -31,6 +41,16 @@ class HandleGraphicsItem(QGraphicsItem):
         self.setFlag(QGraphicsItem.GraphicsItemFlag.ItemIsSelectable, True)
         self.setCursor(Qt.CursorShape.SizeAllCursor)
 
+        # The bounding rect and shape are requested for every paint and hit test, so they are cached.
+        # The bounding rect is reset whenever a handle moves (see handleGeometryChange)
+        # and the shape is built again if the bounding rect it was built for changed
+        self.cached_bounding_rect: Optional[QRectF] = None
+        self.cached_shape: Optional[QPainterPath] = None
+        self.cached_shape_rect: Optional[QRectF] = None
+
+        # Set while several handles are moved at once after the geometry change was already prepared for all of them
+        self.geometry_change_prepared = False
+
         # Create handles
         self.handles = []
         for position in [TOP_LEFT, TOP_RIGHT, BOTTOM_RIGHT, BOTTOM_LEFT]:
@@ -55,7 +75,9 @@ class HandleGraphicsItem(QGraphicsItem):
         # move actions when the user just clicks on the item
         self.move_start_pos: QPointF = None
 
-        self.initContextMenu()
+        self.context_menu: Optional[QMenu] = None
+        if not self.lazy_context_menu:
+            self.initContextMenu()
 
     def initContextMenu(self) -> None:
         """
@@ -64,10 +86,13 @@ class HandleGraphicsItem(QGraphicsItem):
         """
         self.context_menu = QMenu()
 
-        remove_action = self.context_menu.addAction(QIcon(''), 'Remove')
+        remove_action = self.context_menu.addAction(EMPTY_ICON, 'Remove')
         remove_action.triggered.connect(self.remove)
 
     def contextMenuEvent(self, event: QGraphicsSceneContextMenuEvent) -> None:
+        if self.context_menu is None:
+            self.initContextMenu()
+
         self.context_menu.exec(event.screenPos())
 
         super().contextMenuEvent(event)
@@ -80,7 +105,17 @@ class HandleGraphicsItem(QGraphicsItem):
 
         :return: The bounding rectangle of the item
         """
-        return QRectF(self.handles[TOP_LEFT].getCenter(), self.handles[BOTTOM_RIGHT].getCenter())
+        if self.cached_bounding_rect is None:
+            # The rect between the centers of the TOP_LEFT and the BOTTOM_RIGHT handle.
+            # Both centers have the same offset to the handle position, so the size is the difference of the positions
+            top_left = self.handles[TOP_LEFT]
+            bottom_right = self.handles[BOTTOM_RIGHT]
+            half_size = Handle.size / 2
+
+            self.cached_bounding_rect = QRectF(top_left.x() + half_size, top_left.y() + half_size,
+                                               bottom_right.x() - top_left.x(), bottom_right.y() - top_left.y())
+
+        return self.cached_bounding_rect
 
     def shape(self) -> QPainterPath:
         """
@@ -90,10 +125,25 @@ class HandleGraphicsItem(QGraphicsItem):
 
         :return: The bounding rectangle of the item as a QPainterPath
         """
-        path = QPainterPath()
-        path.addRect(self.boundingRect())
+        bounding_rect = self.boundingRect()
+
+        if self.cached_shape is None or bounding_rect != self.cached_shape_rect:
+            self.cached_shape = QPainterPath()
+            self.cached_shape.addRect(bounding_rect)
+            self.cached_shape_rect = QRectF(bounding_rect)
+
+        return self.cached_shape
+
+    def handleGeometryChange(self) -> None:
+        """
+        This method is called by a handle before it moves, which changes the geometry of the item.
+        It notifies the scene about the change and resets the cached bounding rect.
+        """
+        if self.geometry_change_prepared:
+            return
 
-        return path
+        self.prepareGeometryChange()
+        self.cached_bounding_rect = None
 
     def paint(self, painter: QPainter, option: QStyleOptionGraphicsItem, widget: Optional[QWidget] = ...) -> None:
         """
@@ -115,7 +165,9 @@ class HandleGraphicsItem(QGraphicsItem):
         if change == QGraphicsItem.GraphicsItemChange.ItemSelectedChange:
             self.shadow.setEnabled(value)
 
-        return super().itemChange(change, value)
+        # The default implementation of QGraphicsItem only returns the value, so the call into Qt can be skipped.
+        # The item does not set ItemSendsGeometryChanges, so it is not notified about position changes anyway
+        return value
 
     def mousePressEvent(self, event: QGraphicsSceneMouseEvent) -> None:
         """
@@ -130,11 +182,20 @@ class HandleGraphicsItem(QGraphicsItem):
         """
         Override the mouseReleaseEvent to determine whether the item has been moved or not and notify the scene.
         """
-        if abs(self.pos().x() - self.move_start_pos.x()) > 10 or abs(self.pos().y() - self.move_start_pos.y()) > 10:
+        if self.hasMoved():
             self.scene().itemMoved(self)
 
         super().mouseReleaseEvent(event)
 
+    def hasMoved(self) -> bool:
+        """
+        Returns whether the item was moved by more than 10 pixels (in x or y) since the move action started.
+        Smaller movements are treated as clicks.
+        """
+        delta = self.pos() - self.move_start_pos
+
+        return abs(delta.x()) > 10 or abs(delta.y()) > 10
+
     def handlePressed(self, position: int, event: QGraphicsSceneMouseEvent) -> None:
         """
         This method is called when a handle is pressed and the item is about to be resized.
@@ -155,21 +216,15 @@ class HandleGraphicsItem(QGraphicsItem):
         """
         handle = self.handles[position]
 
+        # The area the item covered before the handles are moved
+        old_rect = self.getPaintedSceneRect()
+
         # Move Handles
-        if position == TOP_LEFT:
-            self.handles[BOTTOM_LEFT].setX(handle.x())
-            self.handles[TOP_RIGHT].setY(handle.y())
-        elif position == TOP_RIGHT:
-            self.handles[BOTTOM_RIGHT].setX(handle.x())
-            self.handles[TOP_LEFT].setY(handle.y())
-        elif position == BOTTOM_RIGHT:
-            self.handles[TOP_RIGHT].setX(handle.x())
-            self.handles[BOTTOM_LEFT].setY(handle.y())
-        elif position == BOTTOM_LEFT:
-            self.handles[TOP_LEFT].setX(handle.x())
-            self.handles[BOTTOM_RIGHT].setY(handle.y())
-
-        self.scene().update()
+        self.handles[SAME_X_HANDLE[position]].setX(handle.x())
+        self.handles[SAME_Y_HANDLE[position]].setY(handle.y())
+
+        # Only repaint the area the item covered before and after the change
+        self.scene().update(old_rect.united(self.getPaintedSceneRect()))
 
     def handleReleased(self, position: int, event: QGraphicsSceneMouseEvent) -> None:
         """
@@ -190,27 +245,39 @@ class HandleGraphicsItem(QGraphicsItem):
         bottom right corner of the item.
         This needs to be called after the item has been resized, since the handles are moved freely when the item is resized
         """
+        # The area the item covered before the handles are normalized
+        old_rect = self.getPaintedSceneRect()
+
         # Get all the handle coordinates
-        handles_x = [handle.x() for handle in self.handles]
-        handles_y = [handle.y() for handle in self.handles]
+        top_left, top_right, bottom_right, bottom_left = self.handles
+        x0, x1, x2, x3 = top_left.x(), top_right.x(), bottom_right.x(), bottom_left.x()
+        y0, y1, y2, y3 = top_left.y(), top_right.y(), bottom_right.y(), bottom_left.y()
 
-        # Calculate maximum and minimum coordinates
-        min_x = min(handles_x)
-        min_y = min(handles_y)
-        max_x = max(handles_x)
-        max_y = max(handles_y)
+        # Calculate maximum and minimum coordinates (without creating lists for the four values)
+        min_x = min(x0, x1, x2, x3)
+        min_y = min(y0, y1, y2, y3)
+        max_x = max(x0, x1, x2, x3)
+        max_y = max(y0, y1, y2, y3)
 
         # Move handles so that TOP_LEFT is at (0, 0)
-        self.handles[TOP_LEFT].setPos(0, 0)
-        self.handles[TOP_RIGHT].setPos(max_x - min_x, 0)
-        self.handles[BOTTOM_RIGHT].setPos(max_x - min_x, max_y - min_y)
-        self.handles[BOTTOM_LEFT].setPos(0, max_y - min_y)
+        # The geometry change is only prepared once instead of for each of the handles
+        self.handleGeometryChange()
+        self.geometry_change_prepared = True
+
+        top_left.setPos(0, 0)
+        top_right.setPos(max_x - min_x, 0)
+        bottom_right.setPos(max_x - min_x, max_y - min_y)
+        bottom_left.setPos(0, max_y - min_y)
+
+        self.geometry_change_prepared = False
+        self.cached_bounding_rect = None
 
         # Move entire item to adjust for the new handle positions
         self.moveBy(min_x, min_y)
 
+        # Only repaint the area the item covered before and after the change
         if self.scene():
-            self.scene().update()
+            self.scene().update(old_rect.united(self.getPaintedSceneRect()))
 
     @pyqtSlot()
     def remove(self) -> None:
@@ -229,7 +296,10 @@ class HandleGraphicsItem(QGraphicsItem):
         :param visible: Whether the handles should be visible or not
         """
         for handle in self.handles:
-            handle.brush = QBrush(Qt.GlobalColor.black) if visible else QBrush(Qt.BrushStyle.NoBrush)
+            handle.brush = Handle.visible_brush if visible else Handle.hidden_brush
+
+            # Invisible handles don't draw anything, so the scene doesn't have to call their paint method at all
+            handle.setFlag(QGraphicsItem.GraphicsItemFlag.ItemHasNoContents, not visible)
 
     def setHandleColor(self, color: QColor) -> None:
         """
@@ -237,8 +307,27 @@ class HandleGraphicsItem(QGraphicsItem):
 
         :param color: The color the handles should have
         """
+        # All handles share the same brush
+        brush = QBrush(color)
         for handle in self.handles:
-            handle.brush = QBrush(color)
+            handle.brush = brush
+
+    def getPaintMargin(self) -> float:
+        """
+        Returns how far the item paints outside its bounding rect (and the handles), e.g. because of the border width.
+        Classes that inherit from this class and paint further outside should override this method.
+        """
+        return self.pen.widthF()
+
+    def getPaintedSceneRect(self) -> QRectF:
+        """
+        Returns the area in scene coordinates that is covered by the item, its handles and everything it paints
+        outside its bounding rect.
+        """
+        margin = self.getPaintMargin()
+        rect = self.boundingRect().united(self.childrenBoundingRect())
+
+        return self.mapRectToScene(rect.adjusted(-margin, -margin, margin, margin))
 
     def getHandleSize(self) -> int:
         return self.handles[TOP_LEFT].size
@@ -258,11 +347,18 @@ class HandleGraphicsItem(QGraphicsItem):
         bounding_rect_scene_space = QRectF(self.mapToScene(QPointF(0, 0)),
                                            self.mapToScene(QPointF(self.getWidth(), self.getHeight())))
 
-        for group in self.scene().getGroups():
+        left, right = bounding_rect_scene_space.left(), bounding_rect_scene_space.right()
+        top, bottom = bounding_rect_scene_space.top(), bounding_rect_scene_space.bottom()
+
+        # The group names are not looked up in the index of the scene, since their bounding rect follows the size of
+        # the group without updating the index. The tracked list of groups is iterated directly instead of a copy
+        for group in self.scene().group_items:
+            group_name = group.group_name
+
             # Get the bounding rect of the group name in scene space
-            group_name_rect = QRectF(group.group_name.scenePos(),
-                                     group.group_name.scenePos() + QPointF(group.group_name.boundingRect().width(),
-                                                                           group.group_name.boundingRect().height()))
+            group_name_pos = group_name.scenePos()
+            group_name_size = group_name.boundingRect().size()
+            group_name_rect = QRectF(group_name_pos, group_name_size)
 
             # Check if the item is overlapping with the group name
             if bounding_rect_scene_space.intersects(group_name_rect):
@@ -270,10 +366,10 @@ class HandleGraphicsItem(QGraphicsItem):
                 # Determine in which direction the item should be pushed to not overlap with the group name
 
                 # Determine the distances the item has to be pushed into each direction
-                distance_right = abs(bounding_rect_scene_space.left() - group_name_rect.right())
-                distance_left = abs(bounding_rect_scene_space.right() - group_name_rect.left())
-                distance_up = abs(bounding_rect_scene_space.bottom() - group_name_rect.top())
-                distance_down = abs(bounding_rect_scene_space.top() - group_name_rect.bottom())
+                distance_right = abs(left - group_name_rect.right())
+                distance_left = abs(right - group_name_rect.left())
+                distance_up = abs(bottom - group_name_rect.top())
+                distance_down = abs(top - group_name_rect.bottom())
 
                 # Determine the minimum distance
                 min_distance = min(distance_right, distance_left, distance_up, distance_down)
@@ -306,23 +402,50 @@ class Handle(QGraphicsItem):
     pen = Qt.PenStyle.NoPen
     brush = QBrush(Qt.GlobalColor.black)
 
+    # The brushes used to show and hide the handles, shared by all handles (see setHandlesVisible)
+    visible_brush = brush
+    hidden_brush = QBrush(Qt.BrushStyle.NoBrush)
+
+    # The size of the handles never changes, so the rects are only created once.
+    # The drawn rect is half the size of the bounding rect to make the handles appearance smaller
+    bounding_rect = QRectF(0, 0, size, size)
+    draw_rect = QRectF(size // 4, size // 4, size // 2, size // 2)
+    center_offset = QPointF(size / 2, size / 2)  # The offset from the position (top left corner) to the center
+
     def __init__(self, position: int, parent: HandleGraphicsItem):
         super().__init__(parent)
 
         # Make the handle movable
         self.setFlag(QGraphicsItem.GraphicsItemFlag.ItemIsMovable, True)
 
+        # Get notified about position changes to update the geometry of the parent item (see itemChange)
+        self.setFlag(QGraphicsItem.GraphicsItemFlag.ItemSendsGeometryChanges, True)
+
         self.setZValue(self.parentItem().zValue() + 1)
 
+        # The position of the handle when the parent item was last notified about a move
+        self.last_move_pos: Optional[QPointF] = None
+
         # Set the correct cursor when hovering over the handle
         self.position = position
-        if self.position is TOP_LEFT or self.position is BOTTOM_RIGHT:
+        if self.position == TOP_LEFT or self.position == BOTTOM_RIGHT:
             self.setCursor(Qt.CursorShape.SizeFDiagCursor)
-        elif self.position is TOP_RIGHT or self.position is BOTTOM_LEFT:
+        elif self.position == TOP_RIGHT or self.position == BOTTOM_LEFT:
             self.setCursor(Qt.CursorShape.SizeBDiagCursor)
 
     def boundingRect(self) -> QRectF:
-        return QRectF(0, 0, self.size, self.size)
+        return self.bounding_rect
+
+    def itemChange(self, change: QGraphicsItem.GraphicsItemChange, value: Any) -> Any:
+        """
+        Override the itemChange method to notify the parent item before the handle moves,
+        since the geometry of the parent item is defined by its handles.
+        """
+        if change == QGraphicsItem.GraphicsItemChange.ItemPositionChange and self.parentItem():
+            self.parentItem().handleGeometryChange()
+
+        # The default implementation of QGraphicsItem only returns the value, so the call into Qt can be skipped
+        return value
 
     def paint(self, painter: QPainter, option: QStyleOptionGraphicsItem, widget: Optional[QWidget] = ...) -> None:
         # Configure the painter
@@ -331,20 +454,14 @@ class Handle(QGraphicsItem):
         painter.setPen(self.pen)
         painter.setBrush(self.brush)
 
-        # Reduce the size of the bounding rect by half the size of the handle to make the handles appearance smaller
-        bounding_rect = self.boundingRect()
-
-        width = bounding_rect.width() // 2
-        height = bounding_rect.height() // 2
-
-        draw_rect = QRectF(width // 2, height // 2, width, height)
-
-        painter.drawRect(draw_rect)
+        painter.drawRect(self.draw_rect)
 
     def mousePressEvent(self, event: QGraphicsSceneMouseEvent) -> None:
         """
         Override the mousePressEvent to call the handlePressed method of the parent item.
         """
+        self.last_move_pos = self.pos()
+
         if self.parentItem():
             self.parentItem().handlePressed(self.position, event)
 
@@ -353,12 +470,18 @@ class Handle(QGraphicsItem):
     def mouseMoveEvent(self, event: QGraphicsSceneMouseEvent) -> None:
         """
         Override the mouseMoveEvent to call the handleMoving method of the parent item.
+        The parent item is only notified if the handle actually moved.
         """
+        super().mouseMoveEvent(event)
+
+        pos = self.pos()
+        if pos == self.last_move_pos:
+            return
+        self.last_move_pos = pos
+
         if self.parentItem():
             self.parentItem().handleMoving(self.position, event)
 
-        super().mouseMoveEvent(event)
-
     def mouseReleaseEvent(self, event: QGraphicsSceneMouseEvent) -> None:
         """
         Override the mouseReleaseEvent to call the handleReleased method of the parent item.
@@ -369,7 +492,7 @@ class Handle(QGraphicsItem):
         super().mouseReleaseEvent(event)
 
     def getCenter(self) -> QPointF:
-        return self.pos() + QPointF(self.size / 2, self.size / 2)
+        return self.pos() + self.center_offset
 
     def getSize(self) -> int:
         return self.size
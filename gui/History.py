@@ -1,6 +1,7 @@
-from typing import Dict, Any
+from collections import deque
+from typing import Dict, Any, Optional, Tuple
 
-from PyQt6.QtCore import QTimer
+from PyQt6.QtCore import QElapsedTimer
 
 class History:
     """
@@ -12,70 +13,99 @@ class History:
 
     size = 10
 
+    # Time in ms after an undo/redo action before the next one is possible
+    undo_redo_lock_time = 1000
+
     def __init__(self, search_bar, scene, artsearch):
         # Store references to the objects that should be stored in the history to get their states
         self.search_bar = search_bar
         self.scene = scene
         self.artsearch = artsearch
 
-        self.history = [] # List of timestamps
+        self.history = deque(maxlen=self.size)  # Timestamps, the oldest one is dropped automatically when the size is exceeded
         self.current_index = -1
 
-        # Lock to prevent spamming the history
-        self.undo_redo_lock = False
+        # Measures the time since the last undo/redo action to prevent spamming the history
+        self.undo_redo_timer = QElapsedTimer()
 
     def undo(self) -> None:
         """
         Undo a change if possible
         """
-        if self.current_index > 0 and not self.undo_redo_lock:
+        if self.current_index > 0 and not self.isUndoRedoLocked():
             self.current_index -= 1
             self.restoreTimeStamp(self.current_index)
 
             # Disable the undo and redo action for 1 second, while the undo/redo action is being executed
-            self.undo_redo_lock = True
-            QTimer.singleShot(1000, lambda: setattr(self, 'undo_redo_lock', False))
+            self.undo_redo_timer.start()
 
     def redo(self) -> None:
         """
         Redo a change if possible
         """
-        if self.current_index + 1 < len(self.history) and not self.undo_redo_lock:
+        if self.current_index + 1 < len(self.history) and not self.isUndoRedoLocked():
             self.current_index += 1
             self.restoreTimeStamp(self.current_index)
 
             # Disable the undo and redo action for 1 second, while the undo/redo action is being executed
-            self.undo_redo_lock = True
-            QTimer.singleShot(1000, lambda: setattr(self, 'undo_redo_lock', False))
+            self.undo_redo_timer.start()
+
+    def isUndoRedoLocked(self) -> bool:
+        """
+        Returns whether the last undo/redo action happened less than undo_redo_lock_time ms ago
+        """
+        return self.undo_redo_timer.isValid() and not self.undo_redo_timer.hasExpired(self.undo_redo_lock_time)
 
-    def createTimeStamp(self) -> Dict[str, Dict[str, Any]]:
+    def createTimeStamp(self, changed: Optional[Tuple[str, ...]] = None) -> Dict[str, Dict[str, Any]]:
         """
         Takes a snapshot of the current state of the relevant objects and returns it as a dictionary
 
+        :param changed: The keys of the objects that changed since the current timestamp ('search_bar', 'canvas',
+                        'artsearch'). The other objects are not serialized again, instead their state is shared with
+                        the current timestamp. If None, all objects are serialized
         :return: The state of the application as a dictionary of serialized objects
         """
-        return {
-            'search_bar': self.search_bar.serialize(),
-            'canvas': self.scene.serialize(),
-            'artsearch': self.artsearch.serialize()
+        serializers = {
+            'search_bar': self.search_bar.serialize,
+            'canvas': self.scene.serialize,
+            'artsearch': self.artsearch.serialize
         }
 
-    def addTimeStamp(self) -> None:
+        # Without a current timestamp there is nothing to share
+        if changed is None or not 0 <= self.current_index < len(self.history):
+            return {key: serialize() for key, serialize in serializers.items()}
+
+        current = self.history[self.current_index]
+        return {key: serialize() if key in changed else current[key] for key, serialize in serializers.items()}
+
+    def addTimeStamp(self, changed: Optional[Tuple[str, ...]] = None) -> None:
         """
         Adds the current state of the application to the history.
         If there are timestamps after the current one, they are deleted/overwritten
         If the maximum number of timestamps is exceeded, the oldest one is deleted
+        If the state is the same as in the current timestamp, no timestamp is added
+
+        :param changed: The keys of the objects that changed since the current timestamp, see createTimeStamp.
+                        Only pass this if no other object can have changed since the current timestamp. Many changes
+                        (e.g. marking an image as favorite or renaming a group) don't add a timestamp themselves,
+                        so the canvas is usually serialized again
         """
+        time_stamp = self.createTimeStamp(changed)
+
+        # Don't add the timestamp if nothing changed (e.g. the same search was repeated),
+        # otherwise undo would seemingly do nothing
+        if 0 <= self.current_index < len(self.history) and self.history[self.current_index] == time_stamp:
+            return
+
         # Delete all timestamps that come after the current one if there are any
-        if self.current_index + 1 < len(self.history):
-            self.history = self.history[0:self.current_index + 1]
+        while len(self.history) > self.current_index + 1:
+            self.history.pop()
 
-        # Delete old changes if the maximum is exceeded
-        if self.current_index + 1 >= self.size:
-            self.history = self.history[1:]
+        # The deque drops the oldest timestamp when appending to a full history, which shifts the current one
+        if len(self.history) == self.size:
             self.current_index -= 1
 
-        self.history.append(self.createTimeStamp())
+        self.history.append(time_stamp)
         self.current_index += 1
 
     def popTimeStamp(self) -> None:
@@ -106,7 +136,7 @@ class History:
         """
         Resets the history by deleting all timestamps
         """
-        self.history = []
+        self.history.clear()
         self.current_index = -1
 
     def printDebugInfo(self) -> None:
@@ -1,8 +1,8 @@
 import os
-from typing import Dict, Any
+from typing import Dict, Any, Tuple
 
 from PyQt6.QtWidgets import QWidget, QGraphicsSceneMouseEvent, QStyleOptionGraphicsItem, QApplication
-from PyQt6.QtCore import Qt, QRectF, QPointF, QSize
+from PyQt6.QtCore import Qt, QRect, QRectF, QPointF, QSize
 from PyQt6.QtGui import QPainter, QPixmap, QAction, QIcon, QFocusEvent
 
 from gui.HandleGraphicsItem import *
@@ -12,6 +12,7 @@ from gui.SearchInput import SearchBarLineEdit
 from gui.Util import svgToQImage
 
 BASE_PATH = os.path.dirname(__file__)
+FAVORITE_ICON_PATH = os.path.join(BASE_PATH, 'icons', 'StarIconWithBorder.svg')
 
 
 class ImageGraphicsItem(HandleGraphicsItem):
@@ -21,25 +22,44 @@ class ImageGraphicsItem(HandleGraphicsItem):
     Therefore, an image should only be added by calling the "addImage" method of the CanvasScene,
     where the necessary adjustments are made.
     """
+
+    # The rendered favorite stars shared by all images, keyed by their size in pixels.
+    # The star is only rendered in these sizes and scaled down to the size it is drawn with (see getFavoritePixmap)
+    favorite_pixmaps: Dict[int, QPixmap] = {}
+    favorite_pixmap_sizes = (32, 64, 128, 256, 512)
+    min_favorite_size = 8  # Stars smaller than this (in pixels) would not be recognizable, so they are not drawn
+
+    # Most images are never right-clicked, so their context menu is only created when it is requested
+    lazy_context_menu = True
+
     def __init__(self, id: int, path: str, artsearch):
-        # Set id before parent constructor because initContextMenu is called in the parent constructor
-        # and the id is needed there
-        self.id = id
         super().__init__()
 
+        self.id = id
         self.artsearch = artsearch
 
         self.path = path
         self.pixmap = QPixmap(path)
         self.pixmap_pos = self.handles[TOP_LEFT].getCenter()  # The relative position of the pixmap to the graphics item
-        self.pixmap_scaled = self.pixmap.scaled(int(self.getWidth()), int(self.getHeight()),  # The pixmap scaled to the
-                                                Qt.AspectRatioMode.KeepAspectRatio)           # current size of the graphics item
+
+        # The pixmap scaled to the current size of the graphics item
+        # and the size and transformation mode it was scaled with (see updatePixmapSize)
+        self.pixmap_scaled: QPixmap = None
+        self.pixmap_scaled_key: Tuple[int, int, bool] = None
+        self.updatePixmapSize()
+
         self.placeHandles()  # Place the handles on the corners of the image
 
-        # Stores whether the image is marked as a favorite
+        # Stores whether the image is marked as a favorite (see the favorite property, which also sets the cache mode)
         # Favorites do not affect the search they are only for organization purposes and marked by a star in the top right corner
+        self._favorite = False
         self.favorite = False
-        self.favorite_pixmap = QPixmap.fromImage(svgToQImage(os.path.join(BASE_PATH, 'icons', 'StarIconWithBorder.svg'), QSize(100, 100)))
+
+        # The scaled pixmap with the favorite star already drawn onto it, so paint only has to draw a single pixmap.
+        # It is rebuilt in paint when the scaled pixmap or the favorite flag changed (see getCompositePixmap)
+        self.composite_pixmap: QPixmap = None
+        self.composite_offset = QPointF(0, 0)  # The position of the composite pixmap relative to pixmap_pos
+        self.composite_key: Tuple[Tuple[int, int, bool], bool] = None
 
         self.setHandlesVisible(False)
         self.setZValue(0)
@@ -48,7 +68,7 @@ class ImageGraphicsItem(HandleGraphicsItem):
         super().initContextMenu()
 
         self.favorite_action = QAction('Favorite')
-        self.favorite_action.triggered.connect(self.favorite)
+        self.favorite_action.triggered.connect(self.toggleFavorite)
         self.context_menu.insertAction(self.context_menu.actions()[0], self.favorite_action)
 
         # Action to use the image as the search prompt
@@ -66,6 +86,27 @@ class ImageGraphicsItem(HandleGraphicsItem):
         self.preview_action.triggered.connect(self.preview)
         self.context_menu.insertAction(self.context_menu.actions()[0], self.preview_action)
 
+    @property
+    def favorite(self) -> bool:
+        return self._favorite
+
+    @favorite.setter
+    def favorite(self, favorite: bool) -> None:
+        """
+        Marks the image as favorite or not.
+
+        Images are cached in device coordinates, so panning the canvas only blits the cached pixmap instead of
+        repainting the item. The cache has to be invalidated with update() whenever the content changes.
+        The favorite star is drawn partly outside the bounding rect though, where the cache would cut it off.
+        So favorites are painted without the cache.
+        """
+        self._favorite = favorite
+
+        if favorite:
+            self.setCacheMode(QGraphicsItem.CacheMode.NoCache)
+        else:
+            self.setCacheMode(QGraphicsItem.CacheMode.DeviceCoordinateCache)
+
     def boundingRect(self) -> QRectF:
         return QRectF(self.getHandleSize() // 2, self.getHandleSize() // 2,
                       self.pixmap_scaled.width(), self.pixmap_scaled.height())
@@ -74,26 +115,78 @@ class ImageGraphicsItem(HandleGraphicsItem):
         """
         Overwrite the paint method to draw the pixmap and the favorite star
         """
-        # Draw the correctly scaled pixmap
-        painter.drawPixmap(self.pixmap_pos, self.pixmap_scaled)
+        # Draw the correctly scaled pixmap together with the favorite star (if the image is marked as favorite)
+        painter.drawPixmap(self.pixmap_pos + self.composite_offset, self.getCompositePixmap())
 
-        # Draw the favorite star if the image is marked as favorite
-        if self.favorite:
-            size = self.pixmap_scaled.width() + self.pixmap_scaled.height()
-            size /= 10
-            size = int(size)
+    def getCompositePixmap(self) -> QPixmap:
+        """
+        Returns the scaled pixmap with the favorite star drawn centered on its top right corner.
+        The star reaches outside the scaled pixmap, so the composite pixmap is larger than it and has to be drawn at
+        pixmap_pos + composite_offset. It is only composed again if the scaled pixmap or the favorite flag changed.
+
+        :return: The composite pixmap
+        """
+        key = (self.pixmap_scaled_key, self.favorite)
+        if key == self.composite_key:
+            return self.composite_pixmap
+        self.composite_key = key
+
+        width = self.pixmap_scaled.width()
+        height = self.pixmap_scaled.height()
 
-            favorite_pixmap_scaled = QPixmap.fromImage(svgToQImage(os.path.join(BASE_PATH, 'icons', 'StarIconWithBorder.svg'),
-                                                                   QSize(size, size)))
+        star_size = int((width + height) / 10)
+        half_star_size = star_size // 2
 
-            # Place the star in the top right corner of the pixmap
-            favorite_pixmap_pos = QPointF(self.pixmap_pos.x(), self.pixmap_pos.y())
-            favorite_pixmap_pos -= QPointF(favorite_pixmap_scaled.width() / 2, favorite_pixmap_scaled.height() / 2)
-            favorite_pixmap_pos += QPointF(self.pixmap_scaled.width(), 0)
+        if not self.favorite or star_size < self.min_favorite_size:
+            self.composite_pixmap = self.pixmap_scaled
+            self.composite_offset = QPointF(0, 0)
+            return self.composite_pixmap
 
-            painter.setRenderHint(QPainter.RenderHint.SmoothPixmapTransform)
-            painter.setRenderHint(QPainter.RenderHint.Antialiasing)
-            painter.drawPixmap(favorite_pixmap_pos, favorite_pixmap_scaled)
+        composite_pixmap = QPixmap(width + star_size - half_star_size, height + half_star_size)
+        composite_pixmap.fill(Qt.GlobalColor.transparent)
+
+        painter = QPainter(composite_pixmap)
+        painter.setRenderHint(QPainter.RenderHint.SmoothPixmapTransform)
+        painter.setRenderHint(QPainter.RenderHint.Antialiasing)
+        painter.drawPixmap(0, half_star_size, self.pixmap_scaled)
+        painter.drawPixmap(QRect(width - half_star_size, 0, star_size, star_size), self.getFavoritePixmap(star_size))
+        painter.end()
+
+        self.composite_pixmap = composite_pixmap
+        self.composite_offset = QPointF(0, -half_star_size)
+
+        return self.composite_pixmap
+
+    @classmethod
+    def getFavoritePixmap(cls, size: int) -> QPixmap:
+        """
+        Returns the favorite star rendered in the smallest of the favorite_pixmap_sizes that is at least the given size.
+        Rendering the svg is expensive, so it is only rendered once per size and the star has to be scaled down
+        to the given size when it is drawn.
+
+        :param size: The width and height the star will be drawn with in pixels
+        :return: The rendered star
+        """
+        size = next((pixmap_size for pixmap_size in cls.favorite_pixmap_sizes if pixmap_size >= size),
+                    cls.favorite_pixmap_sizes[-1])
+
+        pixmap = cls.favorite_pixmaps.get(size)
+        if pixmap is None:
+            pixmap = QPixmap.fromImage(svgToQImage(FAVORITE_ICON_PATH, QSize(size, size)))
+            cls.favorite_pixmaps[size] = pixmap
+
+        return pixmap
+
+    def getPaintMargin(self) -> float:
+        """
+        The favorite star is drawn centered on the top right corner, so half of it is outside the bounding rect
+        """
+        margin = super().getPaintMargin()
+
+        if self.favorite:
+            margin = max(margin, (self.pixmap_scaled.width() + self.pixmap_scaled.height()) / 20)
+
+        return margin
 
     def mousePressEvent(self, event: QGraphicsSceneMouseEvent) -> None:
         """
@@ -117,46 +210,36 @@ class ImageGraphicsItem(HandleGraphicsItem):
 
         # Create variables to improve readability
         scene = self.scene()
-        view = scene.views()[0]
+        search_bar = scene.search_bar
+        history = scene.history
 
-        pos_viewport_space = view.mapFromScene(event.scenePos())
-        pos_global_space = view.mapToGlobal(pos_viewport_space)
+        moved = self.hasMoved()
 
-        # Get the widget that the image was dropped on
-        widget = QApplication.widgetAt(pos_global_space)
+        # Get the widget that the image was dropped on (the screen position is already in global coordinates)
+        widget = QApplication.widgetAt(event.screenPos())
 
         if isinstance(widget, SearchBarLineEdit):
             # If the image is dropped on the search input, use it for image search
-            if abs(self.pos().x() - self.move_start_pos.x()) > 10 or abs(self.pos().y() - self.move_start_pos.y()) > 10:
+            if moved:
                 # Remove the time stamp of the image moving, because it will be removed
                 # This has to be done because we have to call the parent method first which creates the timestamp
-                scene.history.popTimeStamp()
+                history.popTimeStamp()
 
             self.setPos(self.move_start_pos)  # Move the image back to its original position
-            scene.search_bar.imageSearch(self.path)
+            search_bar.imageSearch(self.path)
 
         elif isinstance(widget, QWidget):
-            remove = False
-
-            # Recursively check if the widget is a child of the search bar
-            while widget.parent():
-                if scene.search_bar == widget:
-                    remove = True
-                    break
-
-                widget = widget.parent()
-
-            # If the image is dropped on the search bar, remove it
-            if remove:
-                if abs(self.pos().x() - self.move_start_pos.x()) > 10 or abs(self.pos().y() - self.move_start_pos.y()) > 10:
+            # If the image is dropped on the search bar (or any of its children), remove it
+            if search_bar.isAncestorOf(widget):
+                if moved:
                     # Remove the time stamp of the image moving, because it will be removed
                     # This has to be done because we have to call the parent method first which creates the timestamp
-                    scene.history.popTimeStamp()
+                    history.popTimeStamp()
 
                 scene.artsearch.setImageNeutral(self.id)
                 scene.removeItem(self)
-                scene.search_bar.updateResults()
-                scene.history.addTimeStamp()
+                search_bar.updateResults()
+                history.addTimeStamp()
 
     def handleMoving(self, position: int, event: QGraphicsSceneMouseEvent) -> None:
         """
@@ -167,22 +250,28 @@ class ImageGraphicsItem(HandleGraphicsItem):
         """
         super().handleMoving(position, event)
 
-        # Rescale the pixmap to the new size
-        self.updatePixmapSize()
+        # Rescale the pixmap to the new size (fast while resizing, it is scaled smoothly when the handle is released)
+        self.updatePixmapSize(smooth=False)
 
         # Anchor the pixmap to the opposite corner of the handle that is being dragged
+        width = self.pixmap_scaled.width()
+        height = self.pixmap_scaled.height()
+
         if position == TOP_LEFT:
-            self.pixmap_pos = self.handles[BOTTOM_RIGHT].getCenter() - QPointF(self.pixmap_scaled.width(),
-                                                                               self.pixmap_scaled.height())
+            bottom_right = self.handles[BOTTOM_RIGHT].getCenter()
+            self.pixmap_pos = QPointF(bottom_right.x() - width, bottom_right.y() - height)
         elif position == TOP_RIGHT:
             self.pixmap_pos = QPointF(self.handles[TOP_LEFT].getCenter().x(),
-                                      self.handles[BOTTOM_RIGHT].getCenter().y() - self.pixmap_scaled.height())
+                                      self.handles[BOTTOM_RIGHT].getCenter().y() - height)
         elif position == BOTTOM_RIGHT:
             self.pixmap_pos = self.handles[TOP_LEFT].getCenter()
         elif position == BOTTOM_LEFT:
-            self.pixmap_pos = QPointF(self.handles[BOTTOM_RIGHT].getCenter().x() - self.pixmap_scaled.width(),
+            self.pixmap_pos = QPointF(self.handles[BOTTOM_RIGHT].getCenter().x() - width,
                                       self.handles[TOP_LEFT].getCenter().y())
 
+        # The pixmap moved relative to the item, so the cached rendering is outdated
+        self.update()
+
     def handleReleased(self, position: int, event: QGraphicsSceneMouseEvent) -> None:
         """
         When the item is resized place the handles again since the item can be resized freely but the image has a
@@ -190,24 +279,24 @@ class ImageGraphicsItem(HandleGraphicsItem):
         Also readjust the position of the pixmap to the top left corner of the item since it can be moved away from it
         when resized.
         """
+        self.updatePixmapSize()
         self.placeHandles()
         super().handleReleased(position, event)
         self.pixmap_pos = self.handles[TOP_LEFT].getCenter()
+        self.update()
 
     def itemChange(self, change: QGraphicsItem.GraphicsItemChange, value: Any) -> Any:
         """
         Overwrite this method to ensure that the selected image is always on top of the other images
         """
-        if change == QGraphicsItem.GraphicsItemChange.ItemSelectedHasChanged and value:
-            # Move image to top
-            self.setZValue(0)
-
-            # Move all other images one layer down
-            for image in self.scene().getImages():
-                if image is self:
-                    continue
+        # Most notifications are not relevant here, so they are passed on before anything else is checked
+        if change != QGraphicsItem.GraphicsItemChange.ItemSelectedHasChanged:
+            return super().itemChange(change, value)
 
-                image.setZValue(image.zValue() - 1)
+        if value and self.scene():
+            # Move image to top
+            if self.zValue() != self.scene().image_z_value:
+                self.setZValue(self.scene().getNextImageZValue())
 
         return super().itemChange(change, value)
 
@@ -216,19 +305,37 @@ class ImageGraphicsItem(HandleGraphicsItem):
         Places the handles at the corners of pixmap. This is called when the image is moved or resized, since the
         item can be resized freely but the image has a fixed aspect ratio.
         """
-        top_left = self.pixmap_pos - QPointF(self.getHandleSize() / 2, self.getHandleSize() / 2)
-
-        self.handles[TOP_LEFT].setPos(top_left)
-        self.handles[TOP_RIGHT].setPos(top_left + QPointF(self.pixmap_scaled.width(), 0))
-        self.handles[BOTTOM_RIGHT].setPos(top_left + QPointF(self.pixmap_scaled.width(), self.pixmap_scaled.height()))
-        self.handles[BOTTOM_LEFT].setPos(top_left + QPointF(0, self.pixmap_scaled.height()))
-
-    def updatePixmapSize(self) -> None:
+        half_handle_size = self.getHandleSize() / 2
+        left = self.pixmap_pos.x() - half_handle_size
+        top = self.pixmap_pos.y() - half_handle_size
+        width = self.pixmap_scaled.width()
+        height = self.pixmap_scaled.height()
+
+        self.handles[TOP_LEFT].setPos(left, top)
+        self.handles[TOP_RIGHT].setPos(left + width, top)
+        self.handles[BOTTOM_RIGHT].setPos(left + width, top + height)
+        self.handles[BOTTOM_LEFT].setPos(left, top + height)
+
+    def updatePixmapSize(self, smooth: bool = True) -> None:
         """
-        Updates the size of the pixmap to match the size of the bounding rect
+        Updates the size of the pixmap to match the size of the bounding rect.
+        The pixmap is only scaled again if the size (in whole pixels) or the transformation mode changed.
+
+        :param smooth: Whether the pixmap should be scaled with smooth (bilinear) filtering,
+                       which looks better but is too slow to do for every mouse move while resizing
         """
-        self.pixmap_scaled = self.pixmap.scaled(int(self.getWidth()), int(self.getHeight()),
-                                                Qt.AspectRatioMode.KeepAspectRatio)
+        width = int(self.getWidth())
+        height = int(self.getHeight())
+
+        if (width, height, smooth) == self.pixmap_scaled_key:
+            return
+        self.pixmap_scaled_key = (width, height, smooth)
+
+        transformation_mode = Qt.TransformationMode.SmoothTransformation if smooth else Qt.TransformationMode.FastTransformation
+
+        # The bounding rect depends on the scaled pixmap, so the scene and the item cache have to be notified
+        self.prepareGeometryChange()
+        self.pixmap_scaled = self.pixmap.scaled(width, height, Qt.AspectRatioMode.KeepAspectRatio, transformation_mode)
 
     def remove(self) -> None:
         """
@@ -243,8 +350,9 @@ class ImageGraphicsItem(HandleGraphicsItem):
                 # Just delete image
                 self.scene().removeItem(self)
 
-    def favorite(self) -> None:
+    def toggleFavorite(self) -> None:
         self.favorite = not self.favorite
+        self.update()
         self.scene().update()
 
     def putBack(self) -> None:
@@ -1,10 +1,11 @@
-from typing import Callable
+from typing import Callable, Optional, List
 
 from PyQt6.QtWidgets import QLabel, QApplication, QSizePolicy, QMenu, QHBoxLayout
 from PyQt6.QtCore import Qt, QMimeData, pyqtSignal, pyqtSlot, QSize, pyqtProperty, QPropertyAnimation, QEasingCurve
-from PyQt6.QtGui import QDrag, QResizeEvent, QMouseEvent, QPixmap, QContextMenuEvent, QIcon, QKeyEvent
+from PyQt6.QtGui import QImageReader, QDrag, QResizeEvent, QMouseEvent, QPixmap, QContextMenuEvent, QKeyEvent
 
 from gui.PreviewWindow import PreviewWindow
+from gui.Util import EMPTY_ICON
 
 
 class ImageWidget(QLabel):
@@ -17,35 +18,80 @@ class ImageWidget(QLabel):
     add_triggered = pyqtSignal(int)
     put_away_triggered = pyqtSignal(int)
 
+    # The maximum width and height of the pixmap that is used for displaying (see pixmap_display)
+    display_size = 1024
+
     def __init__(self, id: int, path: str, artsearch):
         super().__init__()
 
         self.artsearch = artsearch
 
         self.id = id
-        self.pixmap_original = QPixmap(path)  # The original pixmap is stored to be able to scale it later
+        # The widgets are always scaled from this pixmap, which is at most display_size pixels wide and high.
+        # Large images are decoded directly in that size instead of decoding the (possibly multi-megapixel) original
+        # and scaling it down afterwards, which saves time and memory (e.g. jpeg can be downscaled while decoding)
+        reader = QImageReader(path)
+        image_size = reader.size()
+        if image_size.isValid() and max(image_size.width(), image_size.height()) > self.display_size:
+            reader.setScaledSize(image_size.scaled(self.display_size, self.display_size, Qt.AspectRatioMode.KeepAspectRatio))
+        self.pixmap_display = QPixmap.fromImage(reader.read())
+
+        self.drag_pixmap: QPixmap = None  # The thumbnail shown while dragging, created on the first drag (see getDragPixmap)
 
-        # Create the preview window for the image
-        self.preview_window = PreviewWindow(self.artsearch)
-        self.preview_window.setImage(id, path)
+        # Most images are never previewed, so their preview window is only created when it is shown (see getPreviewWindow)
+        self.path = path
+        self.preview_window: Optional[PreviewWindow] = None
 
         self.initUI()
-        self.initContextMenu()
+
+        # Most images are never right-clicked, so the context menu is only created when it is requested
+        self.context_menu: Optional[QMenu] = None
 
     def initUI(self) -> None:
         self.setCursor(Qt.CursorShape.OpenHandCursor)
-        self.setPixmap(self.pixmap_original)
+        self.setPixmap(self.pixmap_display)
 
     def initContextMenu(self) -> None:
         self.context_menu = QMenu()
 
-        preview_action = self.context_menu.addAction(QIcon(''), 'Show Preview')
-        preview_action.triggered.connect(self.preview_window.show)
+        preview_action = self.context_menu.addAction(EMPTY_ICON, 'Show Preview')
+        preview_action.triggered.connect(self.showPreview)
 
-        add_action = self.context_menu.addAction(QIcon(''), 'Add to Canvas')
+        add_action = self.context_menu.addAction(EMPTY_ICON, 'Add to Canvas')
         add_action.triggered.connect(lambda: self.add_triggered.emit(self.id))
 
+    def getPreviewWindow(self) -> PreviewWindow:
+        """
+        Returns the preview window of the image and creates it if it does not exist yet
+        """
+        if self.preview_window is None:
+            self.preview_window = self.createPreviewWindow()
+
+        return self.preview_window
+
+    def createPreviewWindow(self) -> PreviewWindow:
+        """
+        Creates the preview window for the image
+
+        :return: The created preview window
+        """
+        preview_window = PreviewWindow(self.artsearch)
+        preview_window.setImage(self.id, self.path)
+
+        return preview_window
+
+    def showPreview(self, checked: bool=False) -> None:
+        self.getPreviewWindow().show()
+
+    def hidePreview(self) -> None:
+        # If the preview window was never created, it can't be visible
+        if self.preview_window is not None:
+            self.preview_window.hide()
+
     def contextMenuEvent(self, event: QContextMenuEvent) -> None:
+        if self.context_menu is None:
+            self.initContextMenu()
+
         self.context_menu.exec(event.globalPos())
 
         super().contextMenuEvent(event)
@@ -71,9 +117,9 @@ class ImageWidget(QLabel):
         drag = QDrag(self)
         drag.setMimeData(mime_data)
 
-        pixmap_scaled = self.pixmap_original.scaled(60, 60, Qt.AspectRatioMode.KeepAspectRatio)
-        drag.setPixmap(pixmap_scaled)
-        drag.setHotSpot(pixmap_scaled.rect().center())
+        drag_pixmap = self.getDragPixmap()
+        drag.setPixmap(drag_pixmap)
+        drag.setHotSpot(drag_pixmap.rect().center())
 
         QApplication.setOverrideCursor(Qt.CursorShape.ClosedHandCursor)
         drag.exec(Qt.DropAction.MoveAction)
@@ -83,6 +129,19 @@ class ImageWidget(QLabel):
 
         super().mouseMoveEvent(event)
 
+    def getDragPixmap(self) -> QPixmap:
+        """
+        Returns the thumbnail that is shown under the cursor while the widget is dragged.
+        It is only scaled on the first drag and reused afterwards.
+
+        :return: The image scaled to fit into 60x60 pixels
+        """
+        if self.drag_pixmap is None:
+            self.drag_pixmap = self.pixmap_display.scaled(60, 60, Qt.AspectRatioMode.KeepAspectRatio,
+                                                          Qt.TransformationMode.SmoothTransformation)
+
+        return self.drag_pixmap
+
 class ImageWidgetSearchBar(ImageWidget):
     """
     Extend the default ImageWidget to add logic that is needed when displaying an image in the search bar (results display)
@@ -96,14 +155,29 @@ class ImageWidgetSearchBar(ImageWidget):
         super().__init__(id, path, artsearch)
 
         self._pixmap_width = 0
+        # The pixmap scaled to the height of the widget. The flip animation only squeezes it horizontally,
+        # so it is scaled from this pixmap instead of the larger display pixmap on every frame
+        self.pixmap_fitted = self.pixmap_display
         # This variable is used to store whether the widget is currently animating or not
         # This is needed to prevent the widget from being resized while it is animating
         self.animating = False
 
-        self.preview_window.left_arrow_clicked.connect(self.preview_left_arrow_clicked.emit)
-        self.preview_window.right_arrow_clicked.connect(self.preview_right_arrow_clicked.emit)
+        # The animation is created once and reused for every flip.
+        # The callbacks of the current flip are stored and called when it is finished (see animationFinished)
+        self.anim = QPropertyAnimation(self, b'pixmap_width')
+        self.anim.setDuration(250)
+        self.anim.finished.connect(self.animationFinished)
+        self.anim_callbacks: List[Callable] = []
+
+    def createPreviewWindow(self) -> PreviewWindow:
+        """
+        Override the default preview window to be able to click through the search results with the arrow keys
+        """
+        preview_window = super().createPreviewWindow()
+        preview_window.left_arrow_clicked.connect(self.preview_left_arrow_clicked.emit)
+        preview_window.right_arrow_clicked.connect(self.preview_right_arrow_clicked.emit)
 
-        self.initContextMenu()
+        return preview_window
 
     def initContextMenu(self) -> None:
         """
@@ -111,7 +185,7 @@ class ImageWidgetSearchBar(ImageWidget):
         """
         super().initContextMenu()
 
-        put_away_action = self.context_menu.addAction(QIcon(''), 'Put Away')
+        put_away_action = self.context_menu.addAction(EMPTY_ICON, 'Put Away')
         put_away_action.triggered.connect(lambda: self.put_away_triggered.emit(self.id))
 
     def resizeEvent(self, event: QResizeEvent) -> None:
@@ -119,8 +193,9 @@ class ImageWidgetSearchBar(ImageWidget):
         Override the default resize event to keep rescale the image when the results display is resized
         """
         if not self.animating:
-            self.setPixmap(self.pixmap_original.scaled(9999, self.height(), Qt.AspectRatioMode.KeepAspectRatio))
-            self.setFixedWidth(self.pixmap().width())
+            self.pixmap_fitted = self.pixmap_display.scaled(9999, self.height(), Qt.AspectRatioMode.KeepAspectRatio)
+            self.setPixmap(self.pixmap_fitted)
+            self.setFixedWidth(self.pixmap_fitted.width())
 
         super().resizeEvent(event)
 
@@ -134,16 +209,16 @@ class ImageWidgetSearchBar(ImageWidget):
 
         :param callback: A function to be called when the animation is finished
         """
+        self.finishAnimation()
+
         self.toggleAnimating()
         self.show()
-        self.anim = QPropertyAnimation(self, b'pixmap_width')
-        self.anim.setDuration(250)
         self.anim.setStartValue(0)
         self.anim.setEndValue(self.pixmap().width())
         self.anim.setEasingCurve(QEasingCurve.Type.OutCubic)
-        self.anim.finished.connect(self.toggleAnimating)
+        self.anim_callbacks = [self.toggleAnimating]
         if callback:
-            self.anim.finished.connect(callback)
+            self.anim_callbacks.append(callback)
         self.anim.start()
 
     def flipOut(self, callback: Callable=None) -> None:
@@ -152,18 +227,36 @@ class ImageWidgetSearchBar(ImageWidget):
 
         :param callback: A function to be called when the animation is finished
         """
+        self.finishAnimation()
+
         self.toggleAnimating()
-        self.anim = QPropertyAnimation(self, b'pixmap_width')
-        self.anim.setDuration(250)
         self.anim.setStartValue(self.pixmap().width())
         self.anim.setEndValue(0)
         self.anim.setEasingCurve(QEasingCurve.Type.InCubic)
-        self.anim.finished.connect(self.hide)
-        self.anim.finished.connect(self.toggleAnimating)
+        self.anim_callbacks = [self.hide, self.toggleAnimating]
         if callback:
-            self.anim.finished.connect(callback)
+            self.anim_callbacks.append(callback)
         self.anim.start()
 
+    def finishAnimation(self) -> None:
+        """
+        Stops a running flip animation and calls its callbacks, so the next flip can reuse the animation
+        """
+        if self.anim.state() == QPropertyAnimation.State.Running:
+            self.anim.stop()
+            self.animationFinished()
+
+    @pyqtSlot()
+    def animationFinished(self) -> None:
+        """
+        Calls the callbacks of the flip that just finished
+        """
+        callbacks = self.anim_callbacks
+        self.anim_callbacks = []
+
+        for callback in callbacks:
+            callback()
+
     @pyqtProperty(int)
     def pixmap_width(self) -> int:
         return self._pixmap_width
@@ -172,7 +265,8 @@ class ImageWidgetSearchBar(ImageWidget):
     def pixmap_width(self, width) -> None:
         self._pixmap_width = width
 
-        self.setPixmap(self.pixmap_original.scaled(width, self.height(), Qt.AspectRatioMode.IgnoreAspectRatio))
+        self.setPixmap(self.pixmap_fitted.scaled(width, self.height(), Qt.AspectRatioMode.IgnoreAspectRatio,
+                                                 Qt.TransformationMode.FastTransformation))
 
 
 class ImageWidgetBox(ImageWidget):
@@ -185,5 +279,5 @@ class ImageWidgetBox(ImageWidget):
         self.margin = 20
 
     def setImageWidth(self, width: int) -> None:
-        self.setPixmap(self.pixmap_original.scaled(width - self.margin, 9999, Qt.AspectRatioMode.KeepAspectRatio))
+        self.setPixmap(self.pixmap_display.scaled(width - self.margin, 9999, Qt.AspectRatioMode.KeepAspectRatio))
         self.setFixedHeight(self.pixmap().height())
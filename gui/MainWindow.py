@@ -1,6 +1,8 @@
 import os
 import json
 import xlsxwriter
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional
 from PIL import Image as PIL_Image
 
 from PyQt6.QtWidgets import QMainWindow, QSplitter, QSplitterHandle, QSizePolicy, QFileDialog, QMenu, QApplication
@@ -14,14 +16,17 @@ from gui.AboutWindow import AboutWindow
 from gui.Canvas import Canvas
 from gui.CanvasView import CanvasView
 from gui.ImageWidget import ImageWidget
+from gui.HandleGraphicsItem import HandleGraphicsItem
 from gui.ImageGraphicsItem import ImageGraphicsItem
 from gui.History import History
 from gui.SearchBar import SearchBar
 from gui.Splitter import Splitter
 from gui.Tutorial import TutorialWindow
 from gui.ConfigDialog import ConfigDialog
+from gui.Util import EMPTY_ICON
 
 BASE_PATH = os.path.dirname(__file__)
+CHECK_MARK_ICON_PATH = os.path.join(BASE_PATH, 'icons', 'CheckMarkIcon.svg')
 
 
 class MainWindow(QMainWindow):
@@ -29,6 +34,10 @@ class MainWindow(QMainWindow):
     This is the main window of the entire application. In this window everything comes together.
     It also manages the menu bar and its actions (e.g. save, open, etc.)
     """
+
+    # The check mark icon of the toggleable menu actions, it is loaded on first use (see getCheckMarkIcon)
+    check_mark_icon: Optional[QIcon] = None
+
     def __init__(self, artsearch):
         super().__init__()
 
@@ -126,7 +135,7 @@ class MainWindow(QMainWindow):
 
         # Also store these actions to change the icon to a checkmark when the language is switched
         self.english_action = addAction('English', '', self.switchToEnglish, language_menu)
-        self.english_action.setIcon(QIcon(os.path.join(BASE_PATH, 'icons', 'CheckMarkIcon.svg')))
+        self.english_action.setIcon(self.getCheckMarkIcon())
 
         self.german_action = addAction('German', '', self.switchToGerman, language_menu)
 
@@ -137,13 +146,14 @@ class MainWindow(QMainWindow):
         """
         This function is called when a key is pressed.
         It is used to open the preview window when the space bar is pressed while hovering over an image.
+        Holding the space bar only opens the preview once, the repeated key presses are ignored.
         """
-        if event.key() == Qt.Key.Key_Space:
+        if event.key() == Qt.Key.Key_Space and not event.isAutoRepeat():
             item = QApplication.widgetAt(QCursor.pos())
 
             if isinstance(item, ImageWidget):
                 # For ImageWidgets (Image that are in the search bar or box) a new preview window can simply be opened
-                item.preview_window.show()
+                item.showPreview()
             if isinstance(item.parentWidget(), CanvasView):
                 # For ImageGraphicsItems (Images that are in the canvas),
                 # the preview window will be updated with the new image instead of opening a new one
@@ -180,7 +190,9 @@ class MainWindow(QMainWindow):
 
         if file and file[0]:
             # If the file is valid, load the data from the file and deserialize it
-            data = json.load(open(file[0]))
+            # The whole file is read at once and parsed from the bytes, which avoids reading it in small chunks
+            with open(file[0], 'rb') as json_file:
+                data = json.loads(json_file.read())
 
             self.artsearch.deserialize(data['artsearch'])
             self.scene.deserialize(data['canvas'])
@@ -193,20 +205,31 @@ class MainWindow(QMainWindow):
         # Open a file dialog to select the file to save to
         file = QFileDialog.getSaveFileName(self, 'Save', '', 'json-file (*.json)')
 
-        # Serialize the current state of the application
-        data = {}
-        data['artsearch'] = self.artsearch.serialize()
-        data['canvas'] = self.canvas.getScene().serialize()
-
         if file and file[0]:
             # Check if the correct file extension
             file_name = file[0]
             if file_name[-5:] != '.json':
                 file_name += '.json'
 
-            # Save the data to the file
-            with open(file_name, 'w') as file:
-                json.dump(data, file, indent=2)
+            # Serialize the current state of the application and save it to the file.
+            # The parts are written one after another, so only one of them has to be kept in memory at a time.
+            # The file is written without indentation to keep it small.
+            # The data is written to a temporary file first, which replaces the actual file once it is complete.
+            # This way an existing save is not left incomplete if serializing fails halfway through
+            temp_file_name = file_name + '.tmp'
+            try:
+                with open(temp_file_name, 'w') as file:
+                    file.write('{"artsearch":')
+                    json.dump(self.artsearch.serialize(), file, separators=(',', ':'))
+                    file.write(',"canvas":')
+                    json.dump(self.canvas.getScene().serialize(), file, separators=(',', ':'))
+                    file.write('}')
+
+                os.replace(temp_file_name, file_name)
+            except BaseException:
+                if os.path.exists(temp_file_name):
+                    os.remove(temp_file_name)
+                raise
 
     @pyqtSlot()
     def saveAsPdf(self) -> None:
@@ -228,14 +251,23 @@ class MainWindow(QMainWindow):
             printer.setPageSize(QPageSize(QPageSize.PageSizeId.A3))
             printer.setPageOrientation(QPageLayout.Orientation.Landscape)
 
-            # Create painter to render the canvas
+            # Selected items have a drop shadow, which would have to be blurred at the resolution of the printer.
+            # This is expensive and the shadow should not be part of the export anyway, so it is disabled while rendering.
+            # The selection itself is kept, since selecting an image again would move it on top of the other images
+            shadowed_items = [item for item in self.scene.selectedItems() if isinstance(item, HandleGraphicsItem)]
+            for item in shadowed_items:
+                item.shadow.setEnabled(False)
+
+            # Create painter to render the canvas (the painter is already active on the printer after the constructor)
             painter = QPainter(printer)
-            painter.begin(printer)
 
             # Render the canvas
             self.scene.render(painter, source=self.scene.itemsBoundingRect())
             painter.end()
 
+            for item in shadowed_items:
+                item.shadow.setEnabled(True)
+
     @pyqtSlot()
     def saveAsExcel(self) -> None:
         """
@@ -284,38 +316,38 @@ class MainWindow(QMainWindow):
             # Set the width of the columns
             worksheet.set_column(0, last_column, 10)
 
+            # The columns the Metadata of the search engines is written to. They are the same for every image
+            metadata_columns = [(col, search_engine) for col, search_engine in enumerate(self.artsearch.search_engines.values())
+                                if search_engine.type != 'CLIP']
+
+            # Since the images can have different DPIs, the images have to be scaled accordingly.
+            # Determining the scale only needs the header of each image file, so it is bound by file access
+            # (e.g. when the images are on a network drive) and done in parallel. xlsxwriter is not thread-safe,
+            # so the worksheet is only written on this thread
+            images = self.scene.getImages()
+            with ThreadPoolExecutor() as executor:
+                scale_factors = list(executor.map(self.getExcelImageScale, [image.id for image in images]))
+
             # In this loop the Metadata for each image is written to the worksheet
-            for row, image in enumerate(self.scene.getImages()):
+            for row, (image, scale_factor) in enumerate(zip(images, scale_factors)):
                 current_row = row + 1  # Skip the header
 
                 # Sets the height of the row to 100 to fit the small image
                 worksheet.set_row(current_row, 100)
 
                 # Write the METAdata for the current image into the corresponding columns
-                for col, search_engine in enumerate(self.artsearch.search_engines.values()):
-                    if search_engine.type != 'CLIP':
-                        # Get the Metadata value for the current image
-                        value = search_engine.search_by_id(image.id)
+                for col, search_engine in metadata_columns:
+                    # Get the Metadata value for the current image
+                    value = search_engine.search_by_id(image.id)
 
-                        # Only write the value if it is an actual value and not 'nan'
-                        if value and value != 'nan':
-                            worksheet.write(current_row, col, value, cell_format)
+                    # Only write the value if it is an actual value and not 'nan'
+                    if value and value != 'nan':
+                        worksheet.write(current_row, col, value, cell_format)
 
                 # Write the groups the image is in into the last column (Groups column)
                 worksheet.write(current_row, last_column, ', '.join(groups_dict[image.id]), cell_format)
 
-                # Add preview Image
-                # Since the images can have different DPIs, the image has to be scaled accordingly
-                original_image = PIL_Image.open(self.artsearch.paths[image.id])
-                original_dpi = original_image.info['dpi']
-
-                # Determine the original width of the image and the width after scaling it (with respect to its dpi)
-                original_width = original_image.size[0]
-                scaled_width = self.artsearch.image_widths[image.id] * (original_dpi[0] / 72)  # Adjustment depending on the dpi necessary
-
-                scale_factor = scaled_width / original_width
-
-                # Insert the image into the first column
+                # Add preview Image into the first column
                 worksheet.insert_image(current_row,
                                        0,
                                        self.artsearch.paths[image.id],
@@ -327,6 +359,35 @@ class MainWindow(QMainWindow):
             except xlsxwriter.exceptions.FileCreateError:
                 print("File currently open")
 
+    def getExcelImageScale(self, image_id: int) -> float:
+        """
+        Returns the factor the image has to be scaled with when it is inserted into the Excel file.
+
+        :param image_id: The id of the image
+        :return: The scale factor
+        """
+        # Opening the image with PIL only reads its header (the pixels are not decoded), which contains the dpi and size
+        with PIL_Image.open(self.artsearch.paths[image_id]) as original_image:
+            original_dpi = original_image.info['dpi']
+
+            # Determine the original width of the image and the width after scaling it (with respect to its dpi)
+            original_width = original_image.size[0]
+        scaled_width = self.artsearch.image_widths[image_id] * (original_dpi[0] / 72)  # Adjustment depending on the dpi necessary
+
+        return scaled_width / original_width
+
+    @classmethod
+    def getCheckMarkIcon(cls) -> QIcon:
+        """
+        Returns the check mark icon that marks the active option in the menu bar.
+        The icon is only loaded once, since the options are toggled repeatedly.
+        It can't be loaded on import, because icons can only be created after the QApplication.
+        """
+        if cls.check_mark_icon is None:
+            cls.check_mark_icon = QIcon(CHECK_MARK_ICON_PATH)
+
+        return cls.check_mark_icon
+
     @pyqtSlot()
     def changeDataset(self) -> None:
         config_dialog = ConfigDialog()
@@ -379,9 +440,9 @@ class MainWindow(QMainWindow):
         self.search_bar.results_display.invert_scroll = not self.search_bar.results_display.invert_scroll
 
         if self.search_bar.results_display.invert_scroll:
-            self.invert_scroll_action.setIcon(QIcon(os.path.join(BASE_PATH, 'icons', 'CheckMarkIcon.svg')))
+            self.invert_scroll_action.setIcon(self.getCheckMarkIcon())
         else:
-            self.invert_scroll_action.setIcon(QIcon(''))
+            self.invert_scroll_action.setIcon(EMPTY_ICON)
 
 
     @pyqtSlot()
@@ -394,8 +455,8 @@ class MainWindow(QMainWindow):
         self.german_action.setEnabled(True)
 
         # Adjust the checkmark icons
-        self.english_action.setIcon(QIcon(os.path.join(BASE_PATH, 'icons', 'CheckMarkIcon.svg')))
-        self.german_action.setIcon(QIcon(''))
+        self.english_action.setIcon(self.getCheckMarkIcon())
+        self.german_action.setIcon(EMPTY_ICON)
 
         # Change the search language to English
         self.artsearch.lang = 'EN'
@@ -410,8 +471,8 @@ class MainWindow(QMainWindow):
         self.german_action.setEnabled(False)
 
         # Adjust the checkmark icons
-        self.english_action.setIcon(QIcon(''))
-        self.german_action.setIcon(QIcon(os.path.join(BASE_PATH, 'icons', 'CheckMarkIcon.svg')))
+        self.english_action.setIcon(EMPTY_ICON)
+        self.german_action.setIcon(self.getCheckMarkIcon())
 
         # Change the search language to German
         self.artsearch.lang = 'DE'
@@ -27,6 +27,10 @@ class Note(HandleGraphicsItem):
         self.content.setPlainText('New Note')
         self.content.updateSize()
 
+        # Cache the rendered note in device coordinates, so panning the canvas only blits the cached pixmap
+        # instead of repainting the note. The cache is invalidated by update() whenever the note changes
+        self.setCacheMode(QGraphicsItem.CacheMode.DeviceCoordinateCache)
+
     def initContextMenu(self) -> None:
         """
         Extend the context menu with the option to change the color of the note
@@ -76,14 +80,19 @@ class Note(HandleGraphicsItem):
         if isinstance(color, str):
             color = QColor(color)
 
-        if color.lightnessF() > 0.5:
-            self.content.setDefaultTextColor(QColor('#000000'))
-        else:
-            self.content.setDefaultTextColor(QColor('#FFFFFF'))
+        # Nothing has to be repainted if the color did not change
+        if color == self.brush.color():
+            return
+
+        text_color = QColor('#000000') if color.lightnessF() > 0.5 else QColor('#FFFFFF')
+
+        # Changing the text color repaints the whole text, so it is only set if it actually changes
+        if text_color != self.content.defaultTextColor():
+            self.content.setDefaultTextColor(text_color)
 
         self.brush.setColor(color)
         self.pen.setColor(color.darker(150))
-        self.update()
+        self.update(self.boundingRect())
 
     def setCustomColor(self) -> None:
         """
@@ -113,6 +122,10 @@ class NoteContent(QGraphicsTextItem):
         self.setCursor(Qt.CursorShape.IBeamCursor)
         self.setZValue(self.parentItem().zValue() + 1)
 
+        # Laying out and drawing the text is the expensive part of a note, so it is cached like the note itself.
+        # QGraphicsTextItem calls update() itself whenever the text or the cursor changes
+        self.setCacheMode(QGraphicsItem.CacheMode.DeviceCoordinateCache)
+
     def boundingRect(self) -> QRectF:
         return QRectF(QPointF(0, 0), self.parentItem().parentItem().handles[BOTTOM_RIGHT].pos() -
                       QPointF(self.parentItem().size + 5, self.parentItem().size + 5))
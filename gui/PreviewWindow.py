@@ -1,6 +1,9 @@
+from collections import OrderedDict
+from typing import List, Tuple
+
 from PyQt6.QtWidgets import QWidget, QHBoxLayout, QFormLayout, QLabel, QSizePolicy
 from PyQt6.QtCore import Qt, pyqtSignal
-from PyQt6.QtGui import QPixmap, QKeyEvent
+from PyQt6.QtGui import QPixmap, QKeyEvent, QImageReader
 
 from SearchEngine import METASearch
 
@@ -19,6 +22,12 @@ class PreviewWindow(QWidget):
     left_arrow_clicked = pyqtSignal(int)
     right_arrow_clicked = pyqtSignal(int)
 
+    # The scaled images shared by all preview windows, keyed by their path.
+    # Only the most recently used images are kept (see getPixmap)
+    pixmap_cache: OrderedDict = OrderedDict()
+    pixmap_cache_size = 64
+    pixmap_size = 400
+
     def __init__(self, artsearch):
         super().__init__()
 
@@ -26,8 +35,13 @@ class PreviewWindow(QWidget):
 
         # The initial id is set to -1 (custom image). The id and path have to be set before showing the widget
         self.image_id = -1
+        self.path = None
         self.pixmap = None
 
+        # The METASearch engines of artsearch and the search engines dict they were taken from (see getMetaSearchEngines)
+        self.meta_search_engines: List[Tuple[str, METASearch]] = []
+        self.meta_search_engines_source = None
+
         self.initUI()
 
     def initUI(self) -> None:
@@ -56,42 +70,87 @@ class PreviewWindow(QWidget):
         :param image_id: The id of the image (-1 for custom images that are not in the embedding)
         :param path: The path to the image
         """
+        # Nothing changes if the image is already displayed (e.g. when the same image is previewed again)
+        if image_id == self.image_id and path == self.path and self.pixmap is not None:
+            return
+
         self.image_id = image_id
+        self.path = path
 
-        # Load the image and scale it to 400x400
-        self.pixmap = QPixmap(path).scaled(400, 400, Qt.AspectRatioMode.KeepAspectRatio)
+        # Load the image scaled to 400x400
+        self.pixmap = self.getPixmap(path)
         self.image_label.setPixmap(self.pixmap)
 
-        self.meta_data_layout = QFormLayout()
-        self.meta_data_layout.setRowWrapPolicy(QFormLayout.RowWrapPolicy.DontWrapRows)
-        self.meta_data_layout.setFieldGrowthPolicy(QFormLayout.FieldGrowthPolicy.ExpandingFieldsGrow)
-        self.layout.addLayout(self.meta_data_layout)
+        # Remove the metadata of the previous image (this also deletes the labels)
+        while self.meta_data_layout.rowCount():
+            self.meta_data_layout.removeRow(0)
 
         # Check if the image is a custom image or in the embedding
         if self.image_id != -1:
             # Add the metadata for the image by using the columns of the metadata dataframe (search engine keys)
             # as the labels and the data from the search engine as the data
-            for key, search in self.artsearch.search_engines.items():
-                if isinstance(search, METASearch):
-                    label = QLabel(f'{key}:')
+            for key, search in self.getMetaSearchEngines():
+                label = QLabel(f'{key}:')
+
+                data = search.search_by_id(self.image_id)
 
-                    data = search.search_by_id(self.image_id)
+                # Check if the data is nan and replace it with an empty string in that case
+                if data == 'nan':
+                    data = ''
 
-                    # Check if the data is nan and replace it with an empty string in that case
-                    if data == 'nan':
-                        data = ''
+                data_label = QLabel(data)
+                data_label.setSizePolicy(QSizePolicy.Policy.Expanding, QSizePolicy.Policy.Preferred)
+                data_label.setWordWrap(True)
 
-                    data_label = QLabel(data)
-                    data_label.setSizePolicy(QSizePolicy.Policy.Expanding, QSizePolicy.Policy.Preferred)
-                    data_label.setWordWrap(True)
+                self.meta_data_layout.addRow(label, data_label)
 
-                    self.meta_data_layout.addRow(label, data_label)
+    def getMetaSearchEngines(self) -> List[Tuple[str, METASearch]]:
+        """
+        Returns the keys and METASearch engines of the search engines of artsearch.
+        The list is only filtered again when artsearch created new search engines.
+        """
+        search_engines = self.artsearch.search_engines
+        if search_engines is not self.meta_search_engines_source:
+            self.meta_search_engines = [(key, search) for key, search in search_engines.items() if isinstance(search, METASearch)]
+            self.meta_search_engines_source = search_engines
+
+        return self.meta_search_engines
+
+    @classmethod
+    def getPixmap(cls, path: str) -> QPixmap:
+        """
+        Returns the image at the given path scaled to fit into pixmap_size x pixmap_size.
+        Decoding the image is expensive and the same images are often previewed repeatedly (e.g. when clicking through
+        the search results), so the most recently used images are cached.
+
+        :param path: The path to the image
+        :return: The scaled image
+        """
+        pixmap = cls.pixmap_cache.get(path)
+        if pixmap is not None:
+            cls.pixmap_cache.move_to_end(path)
+            return pixmap
+
+        # Decode the image directly in the scaled size if the format supports reading the size beforehand
+        reader = QImageReader(path)
+        image_size = reader.size()
+        if image_size.isValid():
+            reader.setScaledSize(image_size.scaled(cls.pixmap_size, cls.pixmap_size, Qt.AspectRatioMode.KeepAspectRatio))
+        pixmap = QPixmap.fromImage(reader.read())
+        if not image_size.isValid():
+            pixmap = pixmap.scaled(cls.pixmap_size, cls.pixmap_size, Qt.AspectRatioMode.KeepAspectRatio)
+
+        cls.pixmap_cache[path] = pixmap
+        if len(cls.pixmap_cache) > cls.pixmap_cache_size:
+            cls.pixmap_cache.popitem(last=False)
+
+        return pixmap
 
     def keyPressEvent(self, event: QKeyEvent) -> None:
         """
         Navigate through the search results using the arrow keys and hide the preview window when the space key is pressed
         """
-        if event.key() == Qt.Key.Key_Space:
+        if event.key() == Qt.Key.Key_Space and not event.isAutoRepeat():
             self.hide()
         if event.key() == Qt.Key.Key_Left:
             self.left_arrow_clicked.emit(self.image_id)
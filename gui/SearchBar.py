@@ -112,6 +112,7 @@ class SearchBar(QWidget):
         results = self.artsearch.text_search(text, self.filters.extractFilters())
         self.results_display.show()
         self.results_display.displayResults(results)
+
         self.history.addTimeStamp()
 
     @pyqtSlot(str)
@@ -138,8 +139,9 @@ class SearchBar(QWidget):
             image_path = image_path.replace('/', '\\')
 
         # Add "custom" images to scene
+        # The timestamp is added after the search, so adding the image and searching for it are undone together
         if image_path.encode() not in self.artsearch.paths:
-            self.scene.addCustomImage(image_path)
+            self.scene.addCustomImage(image_path, add_time_stamp=False)
 
         # Display the image in the search input as a small "preview"
         self.search_input.input_field.line_edit.setDisplayType('image')
@@ -152,6 +154,7 @@ class SearchBar(QWidget):
         results = self.artsearch.image_search(image_path, self.filters.extractFilters())
         self.results_display.show()
         self.results_display.displayResults(results)
+
         self.history.addTimeStamp()
 
     def updateResults(self) -> None:
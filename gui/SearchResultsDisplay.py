@@ -283,8 +283,8 @@ class SearchResultsDisplay(QScrollArea):
 
         # Move to the previous image if possible
         if index > 0:
-            image.preview_window.hide()
-            self.layout.itemAt(index - 1).widget().preview_window.show()
+            image.hidePreview()
+            self.layout.itemAt(index - 1).widget().showPreview()
 
     @pyqtSlot(int)
     def shoNextPreview(self, image_id: int) -> None:
@@ -306,8 +306,8 @@ class SearchResultsDisplay(QScrollArea):
 
         # Move to the next image if possible
         if index < self.layout.count() - 1:
-            image.preview_window.hide()
-            self.layout.itemAt(index + 1).widget().preview_window.show()
+            image.hidePreview()
+            self.layout.itemAt(index + 1).widget().showPreview()
 
     def serialize(self) -> Dict[str, Any]:
         return {
@@ -1,6 +1,7 @@
 import json
 import shutil
 import os
+from functools import lru_cache
 import pandas as pd
 
 from data import ImageDataset
@@ -8,10 +9,13 @@ from data import ImageDataset
 from PyQt6.QtWidgets import QErrorMessage
 from PyQt6.QtCore import QSize
 from PyQt6.QtSvg import QSvgRenderer
-from PyQt6.QtGui import QImage, QPainter
+from PyQt6.QtGui import QImage, QPainter, QIcon
 
 BASE_PATH = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 
+# A null icon shared by all actions that have no icon (or had their icon removed)
+EMPTY_ICON = QIcon()
+
 
 def load_config(path: str) -> dict:
     """
@@ -54,16 +58,33 @@ def showError(title: str, message: str) -> None:
 
 def svgToQImage(svg_path:str, image_size: QSize) -> QImage:
     """
-    Converts the given svg to a QImage with the given size
+    Converts the given svg to a QImage with the given size.
+    Rendering an svg is expensive, so the images are cached by path and size.
 
     :param svg_path: The path to the svg file
     :param image_size: The size of the resulting image
     :return: The resulting QImage
     """
+    # QImage is implicitly shared, so the copy is cheap and protects the cached image from being painted on
+    return QImage(renderSvg(svg_path, image_size.width(), image_size.height()))
+
+@lru_cache(maxsize=128)
+def renderSvg(svg_path: str, width: int, height: int) -> QImage:
+    """
+    Renders the given svg into a QImage with the given size.
+    Use svgToQImage instead, this function only exists to cache the rendered images (QSize is not hashable).
+
+    :param svg_path: The path to the svg file
+    :param width: The width of the resulting image
+    :param height: The height of the resulting image
+    :return: The resulting QImage
+    """
     renderer = QSvgRenderer(svg_path)
 
     # Create a transparent image
-    image = QImage(image_size, QImage.Format.Format_ARGB32)
+    # The premultiplied format is what the raster paint engine and QPixmap use internally,
+    # so neither rendering the svg nor QPixmap.fromImage has to convert the pixels
+    image = QImage(width, height, QImage.Format.Format_ARGB32_Premultiplied)
     image.fill(0x00000000)
 
     painter = QPainter(image)
@@ -88,7 +109,8 @@ def copyFile(source: str, destination: str, force: bool=True) -> None:
         else:
             raise FileExistsError(f'File {destination} already exists')
 
-    shutil.copy(source, destination)
+    # Only the content is copied (not the permissions), which allows the OS to copy the file directly
+    shutil.copyfile(source, destination)
 
 def default_preprocessing(input_file: str, image_dir: str, output_file: str):
     """
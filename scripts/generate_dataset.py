@@ -26,7 +26,7 @@ def generate_dataset(image_dir, output_dir, batch_size=100, output_name='MET', n
     # This is used to update the progress bar in the GUI
     # Thread is None if the script is called from the command line
     if thread:
-        thread.starting.emit(len(dataset))
+        thread.reportStart(len(dataset))
         value = 0
 
     image_features = []
@@ -34,7 +34,7 @@ def generate_dataset(image_dir, output_dir, batch_size=100, output_name='MET', n
 
         if thread:
             value += len(images)
-            thread.valueChanged.emit(value)
+            thread.reportProgress(value)
 
         images = images.to(device)
         with torch.no_grad():